@@ -0,0 +1,41 @@
+"""Per-banner render latency with and without the preloaded asset cache.
+
+Run from the repository root: python -m benchmarks.banner [iterations]
+"""
+
+import sys
+import time
+from io import BytesIO
+
+from PIL import Image
+
+from bot.utils.greet import banner_assets, create_banner
+
+
+def make_avatar():
+    avatar = BytesIO()
+    Image.new("RGBA", (512, 512), (120, 180, 240, 255)).save(avatar, format="PNG")
+    return avatar.getvalue()
+
+
+def bench(label, iterations, avatar, reload_each_time):
+    timings = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        if reload_each_time:
+            # What every banner used to cost: reopen backgrounds, font and mask
+            banner_assets.reload()
+        create_banner(avatar, f"member {i}", leave=bool(i % 2))
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    mean = sum(timings) / len(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{label:<10} mean {mean * 1000:7.2f}ms   p95 {p95 * 1000:7.2f}ms")
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    avatar = make_avatar()
+    banner_assets.load()
+    bench("uncached", iterations, avatar, reload_each_time=True)
+    bench("cached", iterations, avatar, reload_each_time=False)
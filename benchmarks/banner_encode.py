@@ -0,0 +1,41 @@
+"""Encode time and output size per banner format for the bundled backgrounds.
+
+Run from the repository root: python -m benchmarks.banner_encode [iterations]
+"""
+
+import sys
+import time
+
+from PIL import Image
+
+from bot.utils.greet import GOODBYE_BG, WELCOME_BG, encode_banner
+
+VARIANTS = [
+    ("png", {}),
+    ("png level 1", {"output_format": "png", "compress_level": 1}),
+    ("png level 9", {"output_format": "png", "compress_level": 9}),
+    ("webp q85", {"output_format": "webp"}),
+    ("webp q70", {"output_format": "webp", "quality": 70}),
+    ("webp lossless", {"output_format": "webp-lossless"}),
+    ("jpeg q88", {"output_format": "jpeg"}),
+    ("png 512px", {"output_format": "png", "width": 512}),
+    ("webp 512px", {"output_format": "webp", "width": 512}),
+]
+
+
+def bench(path, iterations):
+    with Image.open(path) as img:
+        background = img.convert("RGBA")
+    print(f"{path} ({background.width}x{background.height})")
+    for label, options in VARIANTS:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            size = len(encode_banner(background, **options).getvalue())
+        elapsed = (time.perf_counter() - start) / iterations
+        print(f"  {label:<15} {elapsed * 1000:8.2f}ms  {size / 1024:8.1f} KiB")
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    for path in (WELCOME_BG, GOODBYE_BG):
+        bench(path, iterations)
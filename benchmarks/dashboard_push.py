@@ -0,0 +1,89 @@
+"""Dashboard server CPU with many open tabs: polling vs. Socket.IO push.
+
+Start the dashboard (python main.py with DASHBOARD='true'), then run e.g.
+
+    python -m benchmarks.dashboard_push --pid <dashboard pid> --mode poll
+    python -m benchmarks.dashboard_push --pid <dashboard pid> --mode push
+
+`poll` makes every viewer GET /api/stats every --interval seconds (what the
+page used to do), `push` keeps every viewer subscribed over Socket.IO. The
+server's CPU time is read from /proc, so this needs Linux. Needs aiohttp
+and python-socketio[asyncio_client], which the bot itself doesn't use.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+
+import aiohttp
+import socketio
+
+
+def cpu_seconds(pid):
+    # utime + stime of the process, from /proc/<pid>/stat
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+async def poll_viewer(session, url, interval, stop, counts):
+    await asyncio.sleep(random.uniform(0, interval))  # Tabs aren't opened in sync
+    while not stop.is_set():
+        async with session.get(f"{url}/api/stats") as response:
+            await response.read()
+        counts["messages"] += 1
+        await asyncio.sleep(interval)
+
+
+async def push_viewer(url, stop, counts):
+    client = socketio.AsyncClient()
+    client.on("stats", lambda data: counts.update(messages=counts["messages"] + 1))
+    client.on("update", lambda data: counts.update(messages=counts["messages"] + 1))
+    await client.connect(url, transports=["websocket"])
+    await client.emit("subscribe")
+    await stop.wait()
+    await client.disconnect()
+
+
+async def main(args):
+    stop = asyncio.Event()
+    counts = {"messages": 0}
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        if args.mode == "poll":
+            viewers = [
+                poll_viewer(session, args.url, args.interval, stop, counts)
+                for _ in range(args.clients)
+            ]
+        else:
+            viewers = [push_viewer(args.url, stop, counts) for _ in range(args.clients)]
+        tasks = [asyncio.create_task(viewer) for viewer in viewers]
+
+        await asyncio.sleep(args.warmup)  # Let everyone connect first
+        cpu_start, wall_start = cpu_seconds(args.pid), time.monotonic()
+        counts["messages"] = 0
+        await asyncio.sleep(args.duration)
+        cpu = cpu_seconds(args.pid) - cpu_start
+        wall = time.monotonic() - wall_start
+
+        stop.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    print(
+        f"{args.mode:<5} {args.clients} viewers: server CPU {cpu / wall * 100:5.1f}% "
+        f"({cpu:.2f}s over {wall:.0f}s), {counts['messages']} responses/updates"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pid", type=int, required=True, help="dashboard process id")
+    parser.add_argument("--mode", choices=("poll", "push"), default="push")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--interval", type=float, default=30, help="poll interval")
+    parser.add_argument("--duration", type=float, default=120)
+    parser.add_argument("--warmup", type=float, default=15)
+    asyncio.run(main(parser.parse_args()))
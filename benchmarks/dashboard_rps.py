@@ -0,0 +1,58 @@
+"""Requests per second for the dashboard pages on a single worker.
+
+Compares rendering every request (DASHBOARD_CACHE_TTL=0) with the response
+cache, plus repeat visits that send If-None-Match and get a 304. Runs the
+app in-process through Flask's test client, so only the server's own work
+is measured. Run from the repository root:
+
+    SECRET_KEY=x python -m benchmarks.dashboard_rps [seconds per case]
+
+Without gevent installed, also set DASHBOARD_ASYNC_MODE=threading.
+"""
+
+import sys
+import time
+from collections import Counter
+
+from config.shared import close_stats_block, stats_slot
+from dashboard.app import app
+
+
+def bench(client, path, seconds, headers=None):
+    requests = 0
+    statuses = Counter()
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        response = client.get(path, headers=headers)
+        response.get_data()
+        statuses[response.status_code] += 1
+        requests += 1
+    return requests / (time.perf_counter() - start), statuses
+
+
+if __name__ == "__main__":
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 3
+    # Some stats for the pages to show
+    stats_slot(0).update(guild_count=1234, started_at=time.time(), latency_ms=42)
+    client = app.test_client()
+    try:
+        for path in ("/", "/api/stats"):
+            # The cached cases outlive the run, so a page (and its ETag) is
+            # never re-rendered halfway through a case
+            for label, ttl, conditional in (
+                ("uncached", 0, False),
+                ("cached", 3 * seconds + 60, False),
+                ("cached 304", 3 * seconds + 60, True),
+            ):
+                app.config["RESPONSE_CACHE_TTL"] = ttl
+                headers = None
+                if conditional:
+                    etag = client.get(path).headers["ETag"]
+                    headers = {"If-None-Match": etag}
+                rps, statuses = bench(client, path, seconds, headers)
+                codes = ", ".join(
+                    f"{n} x {code}" for code, n in sorted(statuses.items())
+                )
+                print(f"{path:<11} {label:<11} {rps:8.0f} req/s  (HTTP {codes})")
+    finally:
+        close_stats_block()
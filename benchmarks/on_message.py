@@ -0,0 +1,76 @@
+"""Per-message cost of MyClient.on_message for messages outside honey pots.
+
+Drives the bot's real handler with stub messages: `guilds` guilds, a fifth
+of them with a honey pot, and messages spread over their other channels,
+which is nearly all traffic. A second case sends bot messages to the honey
+pot channels, which get past the channel lookup but are ignored.
+
+Needs the bot's requirements installed; nothing connects, so TOKEN can be
+any value. Run from the repository root:
+
+    python -m benchmarks.on_message [guilds] [messages]
+"""
+
+import asyncio
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+os.environ.setdefault("TOKEN", "benchmark")
+
+from bot import main as bot  # noqa: E402  (needs TOKEN set)
+
+
+def make_messages(count, guild_ids, channel_of, bot_author=False):
+    messages = []
+    for _ in range(count):
+        guild_id = random.choice(guild_ids)
+        messages.append(
+            SimpleNamespace(
+                id=random.getrandbits(63),
+                author=SimpleNamespace(id=1, bot=bot_author),
+                guild=SimpleNamespace(id=guild_id, owner_id=2),
+                channel=SimpleNamespace(id=channel_of(guild_id)),
+            )
+        )
+    return messages
+
+
+async def drive(messages, repeat=5):
+    on_message = bot.client.on_message
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for message in messages:
+            await on_message(message)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    guild_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    message_count = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    guild_ids = list(range(10**17, 10**17 + guild_count))
+    honey_guilds = random.sample(guild_ids, guild_count // 5)
+
+    # Only the in-memory map the handler reads; guild_config isn't touched
+    bot.honey_pots.clear()
+    for guild_id in honey_guilds:
+        bot.honey_pots[guild_id * 10] = {"channel_id": guild_id * 10}
+
+    for label, messages in (
+        (
+            "ordinary channel",
+            make_messages(message_count, guild_ids, lambda g: g * 10 + 1),
+        ),
+        (
+            "honey pot, bot author",
+            make_messages(
+                message_count, honey_guilds, lambda g: g * 10, bot_author=True
+            ),
+        ),
+    ):
+        elapsed = asyncio.run(drive(messages))
+        print(f"{label:<22} {elapsed / message_count * 1e9:8.1f} ns/message")
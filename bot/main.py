@@ -1,8 +1,12 @@
 import asyncio
 import json
+import math
 import os
 import random
-from multiprocessing import Manager
+import signal
+import sys
+import time
+from collections import Counter
 from typing import Literal
 
 import discord
@@ -11,9 +15,42 @@ from discord.ui import Button, ChannelSelect, Modal, RoleSelect, TextInput, View
 from discord.utils import get
 from dotenv import load_dotenv
 
-from bot.utils.greet import create_banner
+from bot.utils.banner_service import BannerDropped, BannerService
+from bot.utils.cluster import ClusterBus
+from bot.utils.command_sync import command_tree_hash, load_synced_hash, save_synced_hash
+from bot.utils.config_store import WriteBehindWriter, open_config_store
+from bot.utils.greet import banner_assets
+from bot.utils.integrity import IntegritySweeper
+from bot.utils.join_queue import RoleAssignmentQueue
 from bot.utils.logger import log
-from config.shared import bot_stats  # Import shared variables
+from bot.utils.metrics import MetricsRecorder
+from bot.utils.offenders import OffenderList
+from bot.utils.pipeline import run_stages
+from bot.utils.profile import (
+    build_client_options,
+    build_shard_options,
+    current_rss,
+    parse_features,
+)
+from bot.utils.reaction_index import ReactionRoleIndex, ReactionRoles
+from bot.utils.render_cache import RenderCache
+from bot.utils.workers import LoopLagMonitor, workers
+from config.metrics_history import history_path
+from config.shared import bot_stats, stats_slot  # Import shared variables
+
+# Used to report the time from process start to ready
+STARTED_AT = time.monotonic()
+
+# Stats copied into every timestamped sample of the shared stats ring
+SAMPLE_KEYS = (
+    "started_at",
+    "guild_count",
+    "latency_ms",
+    "events_per_sec",
+    "messages_per_sec",
+    "shards_connected",
+    "loop_lag_ms",
+)
 
 load_dotenv()
 
@@ -24,24 +61,185 @@ if not TOKEN:
         "Discord TOKEN is not set. Please check your environment variable or .env file."
     )
 
+# Slash commands are only synced when their hash differs from the last sync,
+# unless the bot is started with --sync (or FORCE_SYNC='true').
+COMMAND_HASH_FILE = "./config/command_tree.hash"
+FORCE_SYNC = "--sync" in sys.argv or os.getenv("FORCE_SYNC", "false").lower() == "true"
+
 CONFIG_FILE = "./config/guild_config.json"
+CONFIG_DB = os.getenv("CONFIG_DB", "./config/guild_config.db")
 
+# "json" keeps the single guild_config.json file, "sqlite" stores one row per guild.
+config_store = open_config_store(os.getenv("CONFIG_BACKEND"), CONFIG_FILE, CONFIG_DB)
 
-# Load or initialize the configuration file
+
+# Load or initialize the configuration
 def load_config():
-    if not os.path.exists(CONFIG_FILE):
-        with open(CONFIG_FILE, "w") as f:
-            json.dump({}, f)
-    with open(CONFIG_FILE, "r") as f:
-        return json.load(f)
+    return config_store.load()
 
 
-def save_config(config):
-    with open(CONFIG_FILE, "w") as f:
-        json.dump(config, f, indent=4)
+# Mark a guild's config for saving; writes are batched by config_writer
+def save_config(guild_id):
+    config_writer.mark_dirty(guild_id)
 
 
 guild_config = load_config()
+# Saves requested within CONFIG_FLUSH_DELAY seconds are coalesced into one write.
+config_writer = WriteBehindWriter(
+    config_store, guild_config, delay=float(os.getenv("CONFIG_FLUSH_DELAY", "2"))
+)
+
+# Time limit (seconds) for the greeting stage of on_member_join
+GREETING_TIMEOUT = float(os.getenv("GREETING_TIMEOUT", "60"))
+
+# Auto roles are applied with one request per member, paced per guild;
+# AUTO_ROLE_TIMEOUT limits each of those requests.
+role_queue = RoleAssignmentQueue(
+    pace=float(os.getenv("AUTO_ROLE_PACE", "0.25")),
+    timeout=float(os.getenv("AUTO_ROLE_TIMEOUT", "10")),
+)
+
+# Reaction-role messages by int message id; reaction_role_store changes them in
+# guild_config and the index together.
+reaction_index = ReactionRoleIndex()
+reaction_index.rebuild(guild_config)
+reaction_role_store = ReactionRoles(guild_config, reaction_index, save_config)
+set_reaction_role_message = reaction_role_store.set_message
+# Return True if the message (or channel) had reaction roles and got removed
+remove_reaction_role_message = reaction_role_store.remove_message
+remove_reaction_role_channel = reaction_role_store.remove_channel
+
+
+# Accounts caught by honey pots in guilds that opted in to sharing them
+offenders = OffenderList("./config/honey_pot_offenders.json")
+offenders.load()
+
+# Honey pot settings by int channel id; kept in sync by the helpers below.
+honey_pots = {
+    config["honey_pot"]["channel_id"]: config["honey_pot"]
+    for config in guild_config.values()
+    if config.get("honey_pot", {}).get("channel_id")
+}
+
+
+def set_honey_pot(guild_id, settings):
+    guild_id = str(guild_id)
+    old = guild_config.get(guild_id, {}).get("honey_pot")
+    if old:
+        honey_pots.pop(old.get("channel_id"), None)
+    guild_config.setdefault(guild_id, {})["honey_pot"] = settings
+    honey_pots[settings["channel_id"]] = settings
+    save_config(guild_id)
+
+
+def remove_honey_pot(guild_id):
+    config = guild_config.get(str(guild_id), {})
+    honey = config.pop("honey_pot", None)
+    if honey is None:
+        return
+    honey_pots.pop(honey.get("channel_id"), None)
+    save_config(guild_id)
+
+
+async def reload_guild_configs(guild_ids):
+    # Pick up config another cluster process saved; unsaved local changes win.
+    pending = config_writer.pending()
+    guild_ids = [
+        str(guild_id) for guild_id in guild_ids if str(guild_id) not in pending
+    ]
+    fresh = await workers.run_io(config_store.load_guilds, guild_ids)
+    for guild_id in guild_ids:
+        reaction_index.remove_guild(guild_id)
+        old = guild_config.pop(guild_id, {}).get("honey_pot")
+        if old:
+            honey_pots.pop(old.get("channel_id"), None)
+        config = fresh.get(guild_id)
+        if config is None:
+            continue
+        guild_config[guild_id] = config
+        reaction_index.add_guild(guild_id, config)
+        honey = config.get("honey_pot")
+        if honey and honey.get("channel_id"):
+            honey_pots[honey["channel_id"]] = honey
+
+
+def resolve_auto_roles(guild: discord.Guild, bot: bool):
+    # Resolve the configured auto roles for users or bots in one pass. Deleted
+    # roles are removed from the config; roles the bot can't assign are skipped.
+    key = "bots" if bot else "users"
+    role_ids = guild_config.get(str(guild.id), {}).get("auto_roles", {}).get(key, [])
+    roles = []
+    missing = []
+    for role_id in role_ids:
+        role = guild.get_role(int(role_id))
+        if role is None:
+            missing.append(role_id)
+        elif role.is_assignable():
+            roles.append(role)
+    if missing:
+        guild_config[str(guild.id)]["auto_roles"][key] = [
+            role_id for role_id in role_ids if role_id not in missing
+        ]
+        save_config(guild.id)
+    return roles
+
+
+def get_reaction_role_entry(channel_id, message_id):
+    # The config entry for a reaction-role message, found via the index
+    location = reaction_index.location(message_id)
+    if location is None or location[1] != int(channel_id):
+        return {}
+    guild_id, _ = location
+    entry = (
+        guild_config.get(str(guild_id), {})
+        .get("reaction_roles", {})
+        .get(str(channel_id), {})
+        .get(str(message_id), {})
+    )
+    return entry if isinstance(entry, dict) else {}
+
+
+def reaction_role_preview(raw_content):
+    # Short preview of a saved reaction-role message (plain text or Discohook JSON)
+    preview = ""
+    try:
+        data = json.loads(raw_content)
+        if isinstance(data, dict):
+            if data.get("content"):
+                preview = data["content"][:40]
+            elif data.get("embeds") and isinstance(data["embeds"], list):
+                embed = data["embeds"][0]
+                preview = embed.get("title", "")[:40]
+        else:
+            preview = str(data)[:40]
+    except Exception:
+        preview = str(raw_content)[:40]
+    return preview
+
+
+# Banner renders are queued per guild and run on the worker process pool.
+banner_service = BannerService(
+    workers,
+    concurrency=workers.cpu_workers,
+    max_queue=int(os.getenv("BANNER_QUEUE_SIZE", "100")),
+    policy=os.getenv("BANNER_QUEUE_POLICY", "text"),
+    cache=RenderCache(
+        max_bytes=int(os.getenv("BANNER_CACHE_MB", "32")) * 1024 * 1024,
+        disk_dir=os.getenv("BANNER_CACHE_DIR") or None,
+        disk_max_bytes=int(os.getenv("BANNER_CACHE_DISK_MB", "256")) * 1024 * 1024,
+    ),
+    encode_options={
+        # png, webp, webp-lossless or jpeg; optionally downscaled to BANNER_WIDTH
+        "output_format": os.getenv("BANNER_FORMAT", "png"),
+        "width": int(os.getenv("BANNER_WIDTH") or 0) or None,
+        "quality": int(os.getenv("BANNER_QUALITY") or 0) or None,
+        "compress_level": (
+            int(os.getenv("BANNER_PNG_COMPRESS"))
+            if os.getenv("BANNER_PNG_COMPRESS")
+            else None
+        ),
+    },
+)
 
 
 def owner_only(interaction: discord.Interaction) -> bool:
@@ -52,27 +250,132 @@ def owner_only(interaction: discord.Interaction) -> bool:
     )
 
 
-class MyClient(discord.Client):
-    def __init__(self, stats, intents: discord.Intents, activity: discord.Activity):
-        super().__init__(intents=intents, activity=activity)
+class MyClient(discord.AutoShardedClient):
+    def __init__(
+        self,
+        stats,
+        intents: discord.Intents,
+        activity: discord.Activity,
+        **options,
+    ):
+        super().__init__(intents=intents, activity=activity, **options)
         self.tree = app_commands.CommandTree(self)
         self.stats = stats
         self.ready_event = None
+        # Set by join_cluster() when running as one of several bot processes
+        self.cluster_id = None
+        self.cluster_bus = None
+        self.member_joins = 0
+        self.startup_time = None
+        self.started_at = time.time()
+        # Dispatched events by name; "socket_event_type" counts gateway events
+        self.event_counts = Counter()
+        # Gateway events by type ("MESSAGE_CREATE", ...) for the metrics history
+        self.gateway_event_counts = Counter()
+        self._rates_at = time.monotonic()
+        self._rates_counts = (0, 0)
+        # Other counters for the per-minute metrics history
+        self.metric_counts = Counter()
+        self.metrics = None
+        request = self.http.request
+
+        async def counted_request(*args, **kwargs):
+            self.metric_counts["rest_calls"] += 1
+            return await request(*args, **kwargs)
+
+        self.http.request = counted_request
+        self.loop_lag = LoopLagMonitor(
+            threshold=float(os.getenv("LOOP_LAG_THRESHOLD", "0.25"))
+        )
+        self.integrity = IntegritySweeper(
+            self,
+            reaction_index,
+            workers,
+            state_path="./config/integrity_state.json",
+            on_missing_channel=remove_reaction_role_channel,
+            on_missing_message=remove_reaction_role_message,
+            period=int(os.getenv("RR_SWEEP_PERIOD", "604800")),
+            concurrency=int(os.getenv("RR_SWEEP_CONCURRENCY", "4")),
+        )
         self.activities = [
             (discord.ActivityType.streaming, "萌え萌えキュン ♡(⸝⸝> ᴗ•⸝⸝)"),
             (discord.ActivityType.listening, "to cute pings! ૮₍´˶• . • ⑅ ₎ა"),
             (discord.ActivityType.competing, "in a moe contest! ( ๑ ˃̵ᴗ˂̵)و ♡"),
         ]
 
+    def join_cluster(self, cluster_id, shard_ids, shard_count, bus):
+        # Run only `shard_ids` and share config changes with the other clusters
+        self.cluster_id = cluster_id
+        self.shard_ids = shard_ids
+        self.shard_count = shard_count
+        self.cluster_bus = bus
+        # Each cluster writes its own slot of the shared stats block
+        self.stats = stats_slot(cluster_id)
+        self.integrity.state_path = f"./config/integrity_state.{cluster_id}.json"
+        config_writer.on_written = lambda guild_ids: bus.publish("config", guild_ids)
+
+    def on_cluster_message(self, kind, payload):
+        if kind == "config":
+            self.loop.create_task(reload_guild_configs(payload))
+        elif kind == "offender":
+            offenders.merge(*payload)
+            self.loop.create_task(self.save_offenders())
+
+    async def save_offenders(self):
+        # With clusters, only the first one writes the offender file; the others
+        # send it (and each other) their additions over the cluster bus.
+        if self.cluster_id in (None, 0):
+            await workers.run_io(offenders.save, offenders.snapshot())
+
     async def setup_hook(self):
-        # Sync slash commands
-        await self.tree.sync()
+        # Close cleanly (flushing pending config writes) on SIGTERM as well as Ctrl+C
+        try:
+            self.loop.add_signal_handler(
+                signal.SIGTERM, lambda: self.loop.create_task(self.close())
+            )
+        except NotImplementedError:
+            pass  # Not supported on Windows
+        # `kill -HUP <pid>` re-reads the banner backgrounds and font
+        if hasattr(signal, "SIGHUP"):
+            self.loop.add_signal_handler(
+                signal.SIGHUP,
+                lambda: self.loop.create_task(self.reload_banner_assets()),
+            )
+        # Load banner backgrounds/font for the cache key; workers load their own
+        await workers.run_io(banner_assets.load)
+        banner_service.start()
+        if self.cluster_bus is not None:
+            self.cluster_bus.start(self.loop, self.on_cluster_message)
+        await self.sync_commands()
         # Start the stats updater
         self.loop.create_task(self.update_stats())
-        # Add a scheduled task to check reaction role integrity every 86400 seconds (1 day)
+        self.loop.create_task(self.loop_lag.run())
+        self.metrics = MetricsRecorder(
+            self.stats, history_path(self.stats.index), workers, self.metric_totals
+        )
+        self.loop.create_task(self.metrics.run())
+        # Sweep reaction roles for deleted messages every RR_SWEEP_PERIOD (weekly)
         self.loop.create_task(self.check_reaction_roles_integrity())
         self.loop.create_task(self.cycle_activities())
 
+    async def sync_commands(self):
+        # Only the first cluster syncs; the commands are global
+        if self.cluster_id not in (None, 0):
+            return
+        start = time.perf_counter()
+        digest = command_tree_hash(self.tree, self.application_id)
+        if not FORCE_SYNC and digest == await workers.run_io(
+            load_synced_hash, COMMAND_HASH_FILE
+        ):
+            print("Slash commands unchanged, skipping sync.")
+            return
+        synced = await self.tree.sync()
+        await workers.run_io(save_synced_hash, COMMAND_HASH_FILE, digest)
+        print(
+            f"Synced {len(synced)} slash command(s) "
+            f"in {time.perf_counter() - start:.1f}s."
+        )
+
     async def cycle_activities(self):
         await self.wait_until_ready()
         while True:
@@ -89,76 +392,136 @@ class MyClient(discord.Client):
             await asyncio.sleep(30)
 
     async def check_reaction_roles_integrity(self):
-        await self.wait_until_ready()
-        while True:
-            updated = False
-            for guild_id, config in list(guild_config.items()):
-                rr_config = config.get("reaction_roles", {})
-                for channel_key, messages in list(rr_config.items()):
-                    channel = self.get_channel(int(channel_key))
-                    if channel is None:
-                        # Remove entire channel entry if channel no longer exists
-                        del guild_config[guild_id]["reaction_roles"][channel_key]
-                        updated = True
-                        continue
-                    for message_key in list(messages.keys()):
-                        try:
-                            await channel.fetch_message(int(message_key))
-                        except (discord.NotFound, discord.Forbidden):
-                            # Message no longer exists; remove from config
-                            del guild_config[guild_id]["reaction_roles"][channel_key][
-                                message_key
-                            ]
-                            updated = True
-                    # Clean up empty channel entries
-                    if not guild_config[guild_id]["reaction_roles"][channel_key]:
-                        del guild_config[guild_id]["reaction_roles"][channel_key]
-                        updated = True
-            if updated:
-                save_config(guild_config)
-            await asyncio.sleep(86400)  # run every 86400 seconds (1 day)
+        # Deletions are handled by the raw delete events; this sweep is only a
+        # safety net for anything missed while offline (RR_SWEEP_PERIOD, 1 week).
+        await self.integrity.run()
+
+    async def close(self):
+        # Write any pending config changes before disconnecting
+        await config_writer.flush()
+        await super().close()
+        banner_service.stop()
+        workers.shutdown()
 
     async def update_stats(self):
         while True:
-            self.stats["guild_count"] = len(self.guilds)  # Update guild count
+            # One write to the shared stats block per update
+            stats = {"guild_count": len(self.guilds)}  # Update guild count
+            stats.update(config_writer.stats())
+            stats.update(self.loop_lag.stats())
+            stats.update(banner_service.stats())
+            stats.update(self.integrity.stats())
+            stats.update(role_queue.stats())
+            stats["member_joins"] = self.member_joins
+            stats["rss_bytes"] = current_rss()
+            stats["shard_count"] = self.shard_count or len(self.shards)
+            stats["shards"] = self.shard_stats()
+            stats["started_at"] = self.started_at
+            stats["latency_ms"] = self.latency_ms()
+            stats["shards_connected"] = sum(
+                not shard["closed"] for shard in stats["shards"].values()
+            )
+            stats.update(self.event_rates())
+            if self.cluster_bus is not None:
+                stats["cluster_messages_sent"] = self.cluster_bus.sent
+                stats["cluster_messages_received"] = self.cluster_bus.received
+            self.stats.update(stats)
+            self.stats.append_sample(
+                {
+                    "time": time.time(),
+                    "shards_total": len(stats["shards"]),
+                    **{key: stats[key] for key in SAMPLE_KEYS},
+                }
+            )
             await asyncio.sleep(10)  # Update every 10 seconds
 
-    async def on_ready(self):
-        print(f"Ready ~ !! Logged in as {self.user.name}.")
-        # Initialize default configs for new guilds
-        for guild in self.guilds:
-            if str(guild.id) not in guild_config:
-                guild_config[str(guild.id)] = {
-                    "greetings": True,
-                    "welcome_channel": {
-                        "channel_id": (
-                            guild.system_channel.id if guild.system_channel else None
-                        ),
-                        "message_template": {
-                            "user": "Heyo {member.mention} ~ <:haro:1326811765928890450> Welcome to **{guild.name}** !",
-                            "bot": "Beep boob, boop beep ~ {member.mention} just appeared ! <:hallo:1327313451999035415>",
-                        },
-                    },
-                    "goodbye_channel": {
-                        "channel_id": (
-                            guild.system_channel.id if guild.system_channel else None
-                        ),
-                        "message_template": {
-                            "user": '{member.mention} just said a "Goodbye" ~ <:aquacry:1326968634886848623> !\n\nWe hope you had a great time in **{guild.name}** !',
-                            "bot": "Beep boop-... ~ {member.mention} just disappeared ! <:that_hurts:1355670982190432296>",
-                        },
-                    },
-                }
-                save_config(guild_config)
+    def dispatch(self, event, /, *args, **kwargs):
+        self.event_counts[event] += 1
+        if event == "socket_event_type":
+            self.gateway_event_counts[args[0]] += 1
+        super().dispatch(event, *args, **kwargs)
+
+    def event_rates(self):
+        # Gateway events and messages per second since the previous call
+        now = time.monotonic()
+        counts = (self.event_counts["socket_event_type"], self.event_counts["message"])
+        elapsed = max(now - self._rates_at, 1e-9)
+        events, messages = (
+            round((count - previous) / elapsed, 2)
+            for count, previous in zip(counts, self._rates_counts)
+        )
+        self._rates_at, self._rates_counts = now, counts
+        return {"events_per_sec": events, "messages_per_sec": messages}
+
+    def metric_totals(self):
+        # Cumulative counts for MetricsRecorder; it records the change per minute
+        events = self.event_counts
+        return {
+            "events": events["socket_event_type"],
+            "member_joins": events["member_join"],
+            "member_removes": events["member_remove"],
+            "reactions": events["raw_reaction_add"] + events["raw_reaction_remove"],
+            # Every message goes through the honey pot lookup in on_message
+            "honey_pot_scanned": events["message"],
+            "honey_pot_triggers": self.metric_counts["honey_pot_triggers"],
+            "banners_rendered": banner_service.rendered,
+            "reaction_roles_applied": self.metric_counts["reaction_roles_applied"],
+            "rest_calls": self.metric_counts["rest_calls"],
+            "loop_lag_max_ms": round(self.loop_lag.take_window_max() * 1000, 1),
+            "event_types": dict(self.gateway_event_counts),
+        }
+
+    def latency_ms(self):
+        # Average heartbeat latency of this process's shards (nan/inf until connected)
+        latency = self.latency
+        return round(latency * 1000) if math.isfinite(latency) else 0
 
-            await self.notify_missing_channels(guild)
+    def shard_stats(self):
+        # {shard_id: {"latency_ms", "guilds", "closed"}} for the shards of this process
+        guild_counts = {}
+        for guild in self.guilds:
+            guild_counts[guild.shard_id] = guild_counts.get(guild.shard_id, 0) + 1
+        stats = {}
+        for shard_id, shard in self.shards.items():
+            latency = shard.latency
+            stats[shard_id] = {
+                "latency_ms": (
+                    round(latency * 1000) if latency != float("inf") else None
+                ),
+                "guilds": guild_counts.get(shard_id, 0),
+                "closed": shard.is_closed(),
+            }
+        return stats
 
+    async def on_ready(self):
+        print(f"Ready ~ !! Logged in as {self.user.name}.")
         # Update guild count immediately on startup
         self.stats["guild_count"] = len(self.guilds)
+        if self.startup_time is None:
+            self.startup_time = time.monotonic() - STARTED_AT
+            rss = current_rss()
+            self.stats.update(
+                startup_seconds=round(self.startup_time, 2), rss_bytes=rss
+            )
+            memory = f" using {rss / 1024 / 1024:.0f} MiB" if rss is not None else ""
+            print(
+                f"Started in {self.startup_time:.1f}s{memory} "
+                f"(profile: {PERF_PROFILE}, {len(self.guilds)} guild(s))."
+            )
         self.ready_event.set()
 
+    async def on_shard_ready(self, shard_id: int):
+        # Initialize the guilds of each shard as soon as that shard is ready
+        for guild in self.guilds:
+            if guild.shard_id == shard_id:
+                await self.initialize_guild(guild)
+
     async def on_guild_join(self, guild: discord.Guild):
         self.stats["guild_count"] = len(self.guilds)
+        await self.initialize_guild(guild)
+
+    async def initialize_guild(self, guild: discord.Guild):
+        # Initialize default configs for new guilds
         if str(guild.id) not in guild_config:
             guild_config[str(guild.id)] = {
                 "greetings": True,
@@ -181,7 +544,7 @@ class MyClient(discord.Client):
                     },
                 },
             }
-            save_config(guild_config)
+            save_config(guild.id)
 
         await self.notify_missing_channels(guild)
 
@@ -194,10 +557,10 @@ class MyClient(discord.Client):
         if guild.system_channel:
             if not welcome_channel_id:
                 config["welcome_channel"]["channel_id"] = guild.system_channel.id
-                save_config(guild_config)
+                save_config(guild_id)
             if not goodbye_channel_id:
                 config["goodbye_channel"]["channel_id"] = guild.system_channel.id
-                save_config(guild_config)
+                save_config(guild_id)
             # If now both are set, do nothing further.
             if (
                 config["welcome_channel"]["channel_id"]
@@ -232,10 +595,55 @@ class MyClient(discord.Client):
         self.stats["guild_count"] = len(self.guilds)
         guild_id = str(guild.id)
         if guild_id in guild_config:
-            del guild_config[guild_id]
-            save_config(guild_config)
+            remove_honey_pot(guild_id)
+            reaction_role_store.remove_guild(guild_id)
+
+    async def reload_banner_assets(self):
+        # Re-read banner files from disk; render workers reload them on their next job
+        await workers.run_io(banner_assets.reload)
+        banner_service.cache.clear()
+
+    async def send_greeting(
+        self, channel, member: discord.Member, message: str, leave=False
+    ):
+        # Render the banner through the queued render service; when the queue is
+        # saturated it falls back to a text-only greeting (or drops it entirely).
+        try:
+            banner = await banner_service.render(
+                member.guild.id,
+                member.display_avatar.read,
+                member.display_name,
+                leave=leave,
+                avatar_key=member.display_avatar.key,
+            )
+        except BannerDropped:
+            return
+        if banner is None:
+            await channel.send(message)
+            return
+        filename = f"{'goodbye' if leave else 'welcome'}.{banner_service.extension}"
+        await channel.send(message, file=discord.File(banner, filename=filename))
 
     async def on_member_join(self, member: discord.Member):
+        # Roles, greeting and logging run side by side, so new members get their
+        # roles right away even while the banner is still rendering.
+        await run_stages(
+            f"Member join in {member.guild.id}",
+            [
+                # Only queues the roles; the queue applies AUTO_ROLE_TIMEOUT
+                ("auto roles", self.assign_auto_roles(member), 5),
+                ("greeting", self.greet_new_member(member), GREETING_TIMEOUT),
+                ("offender check", self.check_known_offender(member), 10),
+                ("logging", self.log_member_join(member), 5),
+            ],
+        )
+
+    async def assign_auto_roles(self, member: discord.Member):
+        roles = resolve_auto_roles(member.guild, member.bot)
+        if roles:
+            role_queue.submit(member, roles)
+
+    async def greet_new_member(self, member: discord.Member):
         guild_id = str(member.guild.id)
         config = guild_config.get(guild_id, {})
 
@@ -245,26 +653,14 @@ class MyClient(discord.Client):
         welcome_config = config.get("welcome_channel", {})
         channel_id = welcome_config.get("channel_id")
         channel = self.get_channel(channel_id)
-        auto_roles = config.get("auto_roles", {})
-        user_auto_roles = auto_roles.get("users", [])
-        bot_auto_roles = auto_roles.get("bots", [])
 
         if channel:
-            await member.display_avatar.save("./assets/user_pfp.png")
-            img = discord.File(create_banner(member.display_name))
             template = welcome_config.get("message_template", {})
             msg = template.get("bot" if member.bot else "user", "Welcome!")
-            await channel.send(msg.format(member=member), file=img)
-
-            guild = self.get_guild(member.guild.id)
+            await self.send_greeting(channel, member, msg.format(member=member))
 
-            if not member.bot and user_auto_roles:
-                for role in user_auto_roles:
-                    await member.add_roles(guild.get_role(role))
-
-            if member.bot and bot_auto_roles:
-                for role in bot_auto_roles:
-                    await member.add_roles(guild.get_role(role))
+    async def log_member_join(self, member: discord.Member):
+        self.member_joins += 1
 
     async def on_member_remove(self, member: discord.Member):
         guild_id = str(member.guild.id)
@@ -278,122 +674,200 @@ class MyClient(discord.Client):
         channel = self.get_channel(channel_id)
 
         if channel:
-            await member.display_avatar.save("./assets/user_pfp.png")
-            img = discord.File(create_banner(member.display_name, leave=True))
             template = goodbye_config.get("message_template", {})
             msg = template.get("bot" if member.bot else "user", "Goodbye!")
-            await channel.send(msg.format(member=member), file=img)
+            await self.send_greeting(
+                channel, member, msg.format(member=member), leave=True
+            )
 
     async def on_raw_reaction_add(self, payload):
-        guild_id = str(payload.guild_id)
-        config = guild_config.get(guild_id, {})
-        reaction_roles_config = config.get("reaction_roles", {})
-        # Ensure channel_id and message_id are used as string keys
-        channel_key = str(payload.channel_id)
-        message_key = str(payload.message_id)
-        channel_config = reaction_roles_config.get(channel_key, {})
-        if channel_config and message_key in channel_config:
+        # Most reactions are on unrelated messages; bail out with one lookup.
+        roles = reaction_index.messages.get(payload.message_id)
+        if roles is None:
+            return
+        # A reaction proves the message still exists; the sweep can skip it
+        self.integrity.mark_alive(payload.message_id)
+        role_id = roles.get(str(payload.emoji))
+        if role_id:
             guild = self.get_guild(payload.guild_id)
-            # Use the string representation of emoji as stored
-            role_id = channel_config.get(message_key, {}).get(str(payload.emoji))
-            if role_id:
-                role = guild.get_role(int(role_id))
-                member = guild.get_member(payload.user_id)
-                if role and member:
-                    await member.add_roles(role)
+            role = guild.get_role(role_id)
+            member = payload.member or guild.get_member(payload.user_id)
+            if role and member:
+                await member.add_roles(role)
+                self.metric_counts["reaction_roles_applied"] += 1
 
     async def on_raw_reaction_remove(self, payload):
-        guild_id = str(payload.guild_id)
-        config = guild_config.get(guild_id, {})
-        reaction_roles_config = config.get("reaction_roles", {})
-        channel_key = str(payload.channel_id)
-        message_key = str(payload.message_id)
-        channel_config = reaction_roles_config.get(channel_key, {})
-        if channel_config and message_key in channel_config:
+        roles = reaction_index.messages.get(payload.message_id)
+        if roles is None:
+            return
+        role_id = roles.get(str(payload.emoji))
+        if role_id:
             guild = self.get_guild(payload.guild_id)
-            role_id = channel_config.get(message_key, {}).get(str(payload.emoji))
-            if role_id:
-                role = guild.get_role(int(role_id))
-                member = guild.get_member(payload.user_id)
-                if role and member:
-                    await member.remove_roles(role)
-
-    async def on_message_delete(self, message: discord.Message):
-        # If the deleted message was a reaction role message, remove it from config.
-        guild_id = str(message.guild.id)
-        config = guild_config.get(guild_id, {})
-        rr_config = config.get("reaction_roles", {})
-        channel_key = str(message.channel.id)
-        message_key = str(message.id)
-        if channel_key in rr_config and message_key in rr_config[channel_key]:
-            del guild_config[guild_id]["reaction_roles"][channel_key][message_key]
-            # Remove empty channel entries.
-            if not guild_config[guild_id]["reaction_roles"][channel_key]:
-                del guild_config[guild_id]["reaction_roles"][channel_key]
-            save_config(guild_config)
+            role = guild.get_role(role_id)
+            member = guild.get_member(payload.user_id)
+            if role and member:
+                await member.remove_roles(role)
+            elif role:
+                # Member not cached (lean profile): remove the role by id
+                await self.http.remove_role(guild.id, payload.user_id, role_id)
+            else:
+                return
+            self.metric_counts["reaction_roles_applied"] += 1
+
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        # Raw events fire even for uncached messages, so deleted reaction role
+        # messages are removed from config right away instead of by the sweep.
+        if payload.guild_id and payload.message_id in reaction_index:
+            remove_reaction_role_message(
+                payload.guild_id, payload.channel_id, payload.message_id
+            )
+
+    async def on_raw_bulk_message_delete(
+        self, payload: discord.RawBulkMessageDeleteEvent
+    ):
+        if not payload.guild_id:
+            return
+        for message_id in payload.message_ids:
+            if message_id in reaction_index:
+                remove_reaction_role_message(
+                    payload.guild_id, payload.channel_id, message_id
+                )
 
     async def on_message(self, message: discord.Message):
+        # Nearly every message is outside a honey pot: one int dict lookup and out.
+        honey = honey_pots.get(message.channel.id)
+        if honey is None:
+            return
         if message.author.bot or not message.guild:
             return
-        honey = guild_config.get(str(message.guild.id), {}).get("honey_pot")
-        if honey and message.channel.id == honey.get("channel_id"):
-            allow_owner = honey.get("allow_owner", False)
-            if allow_owner and message.author.id == message.guild.owner_id:
-                return
-            try:
-                # Ban the user
-                await message.guild.ban(message.author, reason="Honey pot triggered")
-                # Forward message details to moderation channel if configured
-                mod_channel_id = guild_config.get(str(message.guild.id), {}).get(
-                    "honey_pot_mod_channel"
-                )
-                if mod_channel_id:
-                    mod_channel = self.get_channel(mod_channel_id)
-                    if mod_channel:
-                        embed = Embed(
-                            title="Honey Pot Alert",
-                            description=(
-                                f"User {message.author.mention} triggered the honey pot in "
-                                f"{message.channel.mention}."
-                            ),
-                            color=0xFF0000,
-                        )
-                        embed.add_field(
-                            name="Message Content",
-                            value=message.content or "No content",
-                            inline=False,
-                        )
-                        embed.set_footer(
-                            text=f"User ID: {message.author.id} | Channel ID: {message.channel.id}"
-                        )
-                        await mod_channel.send(embed=embed)
-                # Delete message
-                await message.delete()
-            except Exception as e:
-                print(f"Error handling honey pot for {message.author}: {e}")
+        allow_owner = honey.get("allow_owner", False)
+        if allow_owner and message.author.id == message.guild.owner_id:
+            return
+        self.metric_counts["honey_pot_triggers"] += 1
+        # Delete first so the spam disappears as soon as possible; the ban, the
+        # purge of other channels and the mod alert go out at the same time.
+        results = await asyncio.gather(
+            message.delete(),
+            message.guild.ban(message.author, reason="Honey pot triggered"),
+            self.purge_cached_messages(message),
+            self.send_honey_pot_alert(message, honey),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                print(f"Error handling honey pot for {message.author}: {result}")
+        if honey.get("share_offenders"):
+            entry = offenders.add(message.author.id, message.guild.id)
+            if self.cluster_bus is not None:
+                self.cluster_bus.publish("offender", (message.author.id, entry))
+            await self.save_offenders()
+
+    async def purge_cached_messages(self, message: discord.Message):
+        # Remove the offender's other recent messages in this guild, using the
+        # message cache and one bulk delete per channel.
+        by_channel = {}
+        for cached in self.cached_messages:
+            if (
+                cached.author.id == message.author.id
+                and cached.guild == message.guild
+                and cached.id != message.id
+            ):
+                by_channel.setdefault(cached.channel, []).append(cached)
+        results = await asyncio.gather(
+            *(
+                channel.delete_messages(messages[i : i + 100])
+                for channel, messages in by_channel.items()
+                for i in range(0, len(messages), 100)
+            ),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                print(f"Error purging messages of {message.author}: {result}")
+
+    async def send_honey_pot_alert(self, message: discord.Message, honey):
+        # Forward message details to moderation channel if configured
+        mod_channel_id = honey.get("honey_pot_mod_channel") or guild_config.get(
+            str(message.guild.id), {}
+        ).get("honey_pot_mod_channel")
+        if not mod_channel_id:
+            return
+        mod_channel = self.get_channel(mod_channel_id)
+        if mod_channel:
+            embed = Embed(
+                title="Honey Pot Alert",
+                description=(
+                    f"User {message.author.mention} triggered the honey pot in "
+                    f"{message.channel.mention}."
+                ),
+                color=0xFF0000,
+            )
+            embed.add_field(
+                name="Message Content",
+                value=message.content or "No content",
+                inline=False,
+            )
+            embed.set_footer(
+                text=f"User ID: {message.author.id} | Channel ID: {message.channel.id}"
+            )
+            await mod_channel.send(embed=embed)
+
+    async def check_known_offender(self, member: discord.Member):
+        # Warn the mods if a new member was caught by a honey pot in another guild
+        honey = guild_config.get(str(member.guild.id), {}).get("honey_pot")
+        if not honey or not honey.get("share_offenders"):
+            return
+        entry = offenders.get(member.id)
+        if entry is None or entry["guild_id"] == member.guild.id:
+            return
+        mod_channel = self.get_channel(honey.get("honey_pot_mod_channel"))
+        if mod_channel:
+            embed = Embed(
+                title="Honey Pot Warning",
+                description=(
+                    f"{member.mention} just joined and was caught by a honey pot "
+                    f"in another server <t:{int(entry['time'])}:R>."
+                ),
+                color=0xFFA500,
+            )
+            embed.set_footer(text=f"User ID: {member.id}")
+            await mod_channel.send(embed=embed)
 
     async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
-        config = guild_config.get(str(channel.guild.id), {})
-        honey = config.get("honey_pot")
-        if honey and honey.get("channel_id") == channel.id:
-            del config["honey_pot"]
-            save_config(guild_config)
+        if channel.id in reaction_index.channels:
+            remove_reaction_role_channel(channel.guild.id, channel.id)
+        if channel.id in honey_pots:
+            remove_honey_pot(channel.guild.id)
 
 
 activity = discord.Activity(
     name="萌え萌えキュン ♡(⸝⸝> ᴗ•⸝⸝)", type=discord.ActivityType.streaming
 )
-intents = discord.Intents.default()
-intents.message_content = True
-intents.members = True
-client = MyClient(bot_stats, intents, activity)
+# Intents and member/message caches depend on the enabled FEATURES and on
+# PERF_PROFILE ("full" caches everything, "lean" only what the features need).
+PERF_PROFILE = os.getenv("PERF_PROFILE", "full")
+client_options = build_client_options(
+    parse_features(os.getenv("FEATURES")), PERF_PROFILE
+)
+# Shards: SHARD_COUNT (default: Discord's recommendation) and optionally the
+# SHARD_IDS this process runs, e.g. "0-3".
+client_options.update(
+    build_shard_options(os.getenv("SHARD_COUNT"), os.getenv("SHARD_IDS"))
+)
+client = MyClient(bot_stats, activity=activity, **client_options)
 
 
 @client.tree.command(name="ping", description="Check the bot's response time.")
 async def ping(interaction: discord.Interaction):
-    latency = round(client.latency * 1000)  # Convert to milliseconds
+    # Report the latency of the shard this guild is on
+    shard_id = interaction.guild.shard_id if interaction.guild else 0
+    shard = client.get_shard(shard_id)
+    latency = shard.latency if shard else client.latency
+    latency = round(latency * 1000)  # Convert to milliseconds
     await interaction.response.send_message(
-        f"Pong! 🏓 | Response time: {latency}ms", ephemeral=True
+        f"Pong! 🏓 | Response time: {latency}ms "
+        f"(shard {shard_id + 1}/{client.shard_count})",
+        ephemeral=True,
     )
 
 
@@ -413,7 +887,7 @@ async def greetings(interaction: discord.Interaction, action: app_commands.Choic
     guild_id = str(interaction.guild_id)
     if guild_id in guild_config:
         guild_config[guild_id]["greetings"] = True if action.value == "true" else False
-        save_config(guild_config)
+        save_config(guild_id)
 
     await interaction.response.send_message(
         f"Greeting messages has been {action.name.lower()}d.", ephemeral=True
@@ -434,9 +908,6 @@ async def greet_member(interaction: discord.Interaction, member: discord.Member)
     welcome_config = config.get("welcome_channel", {})
     channel_id = welcome_config.get("channel_id")
     channel = client.get_channel(channel_id)
-    auto_roles = config.get("auto_roles", {})
-    user_auto_roles = auto_roles.get("users", [])
-    bot_auto_roles = auto_roles.get("bots", [])
 
     if channel:
         await interaction.response.send_message(
@@ -444,21 +915,15 @@ async def greet_member(interaction: discord.Interaction, member: discord.Member)
             ephemeral=True,
         )
 
-        await member.display_avatar.save("./assets/user_pfp.png")
-        img = discord.File(create_banner(member.display_name))
         template = welcome_config.get("message_template", {})
         msg = template.get("bot" if member.bot else "user", "Welcome!")
-        await channel.send(msg.format(member=member, guild=interaction.guild), file=img)
-
-        guild = interaction.guild
-
-        if not member.bot and user_auto_roles:
-            for role in user_auto_roles:
-                await member.add_roles(guild.get_role(role))
+        await client.send_greeting(
+            channel, member, msg.format(member=member, guild=interaction.guild)
+        )
 
-        if member.bot and bot_auto_roles:
-            for role in bot_auto_roles:
-                await member.add_roles(guild.get_role(role))
+        roles = resolve_auto_roles(interaction.guild, member.bot)
+        if roles:
+            role_queue.submit(member, roles)
 
     else:
         await interaction.response.send_message(
@@ -478,7 +943,7 @@ async def set_greeting_channel(
     guild_id = str(interaction.guild_id)
     if guild_id in guild_config:
         guild_config[guild_id]["welcome_channel"]["channel_id"] = channel.id
-        save_config(guild_config)
+        save_config(guild_id)
     await interaction.response.send_message(
         f"Welcome greeting channel set to {channel.mention}", ephemeral=True
     )
@@ -496,7 +961,7 @@ async def set_goodbye_channel(
     guild_id = str(interaction.guild_id)
     if guild_id in guild_config:
         guild_config[guild_id]["goodbye_channel"]["channel_id"] = channel.id
-        save_config(guild_config)
+        save_config(guild_id)
     await interaction.response.send_message(
         f"Goodbye message channel set to {channel.mention}", ephemeral=True
     )
@@ -537,33 +1002,27 @@ class ReactionRoleMainView(View):
     async def manage_reaction_roles(
         self, interaction: discord.Interaction, button: Button
     ):
-        guid_id = str(interaction.guild_id)
-        config = guild_config.get(guid_id, {})
-        reaction_roles_ = config.get("reaction_roles", {})
+        # All messages of this guild as a list of (channel_id, message_id)
+        rr_list = reaction_index.guild_messages(interaction.guild_id)
 
-        if not reaction_roles_ or not any(reaction_roles_.values()):
+        if not rr_list:
             await interaction.response.edit_message(
                 content="No reaction roles are currently set.",
                 view=None,
             )
             return
 
-        # Flatten all messages into a list of (channel_id, message_id)
-        rr_list = []
-        for channel_id, messages in reaction_roles_.items():
-            for msg_id in messages:
-                rr_list.append((channel_id, msg_id))
-
         await interaction.response.edit_message(
             content="Select a reaction role message to manage:",
-            view=ReactionRoleListView(rr_list),
+            view=ReactionRoleListView(rr_list, interaction.guild),
         )
 
 
 class ReactionRoleListView(View):
-    def __init__(self, rr_list):
+    def __init__(self, rr_list, guild: discord.Guild):
         super().__init__(timeout=300)
         self.rr_list = rr_list
+        self.guild = guild
         for channel_id, msg_id in rr_list:
             # Set label at creation time
             label = self._get_label(channel_id, msg_id)
@@ -573,45 +1032,13 @@ class ReactionRoleListView(View):
         # Try to get channel name and message preview from config
         channel_name = f"#{channel_id}"
         preview = ""
-        # Try to get channel name from the global client if possible
-        channel = None
-        try:
-            # This import is safe here because client is defined globally
-            from __main__ import client
-
-            for guild in client.guilds:
-                ch = guild.get_channel(int(channel_id))
-                if ch:
-                    channel = ch
-                    break
-        except Exception:
-            pass
+        channel = self.guild.get_channel(int(channel_id)) if self.guild else None
         if channel and hasattr(channel, "name"):
             channel_name = f"#{channel.name}"
         # Try to get preview from config
-        for guild_id, config in guild_config.items():
-            rrdata = (
-                config.get("reaction_roles", {}).get(channel_id, {}).get(msg_id, {})
-            )
-            msg_content = rrdata.get("_raw_content")
-            if msg_content:
-                try:
-                    data = json.loads(msg_content)
-                    if isinstance(data, dict):
-                        if data.get("content"):
-                            preview = data["content"][:40]
-                        elif (
-                            data.get("embeds")
-                            and isinstance(data["embeds"], list)
-                            and data["embeds"]
-                        ):
-                            embed = data["embeds"][0]
-                            preview = embed.get("title", "")[:40]
-                    else:
-                        preview = str(data)[:40]
-                except Exception:
-                    preview = str(msg_content)[:40]
-                break
+        msg_content = get_reaction_role_entry(channel_id, msg_id).get("_raw_content")
+        if msg_content:
+            preview = reaction_role_preview(msg_content)
         if not preview:
             preview = "(no content)"
         return f"{channel_name}: {preview}"
@@ -636,31 +1063,11 @@ class ReactionRoleMessageButton(Button):
             return
         # Try to get preview from config
         preview = ""
-        guid_id = str(interaction.guild_id)
-        config = guild_config.get(guid_id, {})
-        rrdata = (
-            config.get("reaction_roles", {})
-            .get(self.channel_id, {})
-            .get(self.msg_id, {})
+        msg_content = get_reaction_role_entry(self.channel_id, self.msg_id).get(
+            "_raw_content"
         )
-        msg_content = rrdata.get("_raw_content")
         if msg_content:
-            try:
-                data = json.loads(msg_content)
-                if isinstance(data, dict):
-                    if data.get("content"):
-                        preview = data["content"][:40]
-                    elif (
-                        data.get("embeds")
-                        and isinstance(data["embeds"], list)
-                        and data["embeds"]
-                    ):
-                        embed = data["embeds"][0]
-                        preview = embed.get("title", "")[:40]
-                else:
-                    preview = str(data)[:40]
-            except Exception:
-                preview = str(msg_content)[:40]
+            preview = reaction_role_preview(msg_content)
         else:
             try:
                 msg = await channel.fetch_message(int(self.msg_id))
@@ -713,30 +1120,17 @@ class ReactionRoleEditView(View):
             )
             return
         # Remove from config
-        guid_id = str(interaction.guild_id)
-        if guid_id in guild_config:
-            rr = guild_config[guid_id].get("reaction_roles", {})
-            if self.channel_id in rr and self.msg_id in rr[self.channel_id]:
-                del rr[self.channel_id][self.msg_id]
-                if not rr[self.channel_id]:
-                    del rr[self.channel_id]
-                save_config(guild_config)
+        remove_reaction_role_message(interaction.guild_id, self.channel_id, self.msg_id)
         await interaction.response.edit_message(
             content="Reaction role message deleted.", view=None
         )
 
     @discord.ui.button(label="Back", style=discord.ButtonStyle.secondary, row=1)
     async def back(self, interaction: discord.Interaction, button: Button):
-        guid_id = str(interaction.guild_id)
-        config = guild_config.get(guid_id, {})
-        reaction_roles_ = config.get("reaction_roles", {})
-        rr_list = []
-        for channel_id, messages in reaction_roles_.items():
-            for msg_id in messages:
-                rr_list.append((channel_id, msg_id))
+        rr_list = reaction_index.guild_messages(interaction.guild_id)
         await interaction.response.edit_message(
             content="Select a reaction role message to manage:",
-            view=ReactionRoleListView(rr_list),
+            view=ReactionRoleListView(rr_list, interaction.guild),
         )
 
 
@@ -746,16 +1140,9 @@ class ReactionRoleEditModal(Modal, title="Edit Reaction Role Message"):
         self.channel_id = channel_id
         self.msg_id = msg_id
         # Load the saved message content from config
-        self.default_content = ""
-        for guild_id, config in guild_config.items():
-            rr = config.get("reaction_roles", {}).get(channel_id, {})
-            if (
-                msg_id in rr
-                and isinstance(rr[msg_id], dict)
-                and rr[msg_id].get("_raw_content")
-            ):
-                self.default_content = rr[msg_id]["_raw_content"]
-                break
+        self.default_content = get_reaction_role_entry(channel_id, msg_id).get(
+            "_raw_content", ""
+        )
         self.message_input = TextInput(
             label="Message Content",
             placeholder="Enter plain text (Markdown supported) or paste JSON from Discohook's JSON Data Editor.",
@@ -793,11 +1180,13 @@ class ReactionRoleEditModal(Modal, title="Edit Reaction Role Message"):
             if guid_id in guild_config:
                 rr = guild_config[guid_id].get("reaction_roles", {})
                 if self.channel_id in rr and self.msg_id in rr[self.channel_id]:
-                    if isinstance(rr[self.channel_id][self.msg_id], dict):
-                        rr[self.channel_id][self.msg_id]["_raw_content"] = content_raw
-                    else:
-                        rr[self.channel_id][self.msg_id] = {"_raw_content": content_raw}
-                    save_config(guild_config)
+                    entry = rr[self.channel_id][self.msg_id]
+                    if not isinstance(entry, dict):
+                        entry = {}
+                    entry["_raw_content"] = content_raw
+                    set_reaction_role_message(
+                        guid_id, self.channel_id, self.msg_id, entry
+                    )
         except Exception:
             await interaction.response.send_message(
                 "Failed to edit message.", ephemeral=True
@@ -1052,20 +1441,13 @@ class ReactionRoleSummaryView(View):
                 await sent_message.add_reaction(emoji)
             except discord.HTTPException:
                 print(f"Failed to add reaction: {emoji}")
-        guild_id = str(interaction.guild_id)
-        msg_id = str(sent_message.id)
-        if guild_id not in guild_config:
-            guild_config[guild_id] = {"reaction_roles": {}}
-        if str(self.channel_id) not in guild_config[guild_id].get("reaction_roles", {}):
-            guild_config[guild_id].setdefault("reaction_roles", {})[
-                str(self.channel_id)
-            ] = {}
         # Save both the emoji-role mapping and the raw content
-        guild_config[guild_id]["reaction_roles"][str(self.channel_id)][msg_id] = {
-            **self.accum,
-            "_raw_content": self.message_content,
-        }
-        save_config(guild_config)
+        set_reaction_role_message(
+            interaction.guild_id,
+            self.channel_id,
+            sent_message.id,
+            {**self.accum, "_raw_content": self.message_content},
+        )
         await interaction.response.edit_message(
             content=f"Reaction role message sent in <#{self.channel_id}>.",
             view=None,
@@ -1125,7 +1507,7 @@ class TemplateUpdateModal(Modal, title="Update Message Template"):
             "user": new_user,
             "bot": new_bot,
         }
-        save_config(guild_config)
+        save_config(guild_id)
         embed = Embed(
             title="Message Template Updated",
             description=(
@@ -1227,19 +1609,17 @@ async def add_reaction_role(
         await interaction.followup.send(f"Error adding reaction: {e}", ephemeral=True)
         return
 
-    if guild_id not in guild_config:
-        guild_config[guild_id] = {}
-    guild_config[guild_id].setdefault("reaction_roles", {})
     channel_key = str(channel.id)
-    guild_config[guild_id]["reaction_roles"].setdefault(channel_key, {})
     message_key = message_id
     # Merge new emoji-role pair into the dictionary, preserving existing pairs if any.
-    existing = guild_config[guild_id]["reaction_roles"][channel_key].get(
-        message_key, {}
+    existing = (
+        guild_config.get(guild_id, {})
+        .get("reaction_roles", {})
+        .get(channel_key, {})
+        .get(message_key, {})
     )
     existing[str(emoji)] = str(role.id)
-    guild_config[guild_id]["reaction_roles"][channel_key][message_key] = existing
-    save_config(guild_config)
+    set_reaction_role_message(guild_id, channel_key, message_key, existing)
 
     await interaction.followup.send(
         f"Successfully added reaction role: {emoji} ➡️ {role.mention} on message ID {message_id} in {channel.mention}.",
@@ -1255,6 +1635,10 @@ async def add_reaction_role(
     channel="Select a public text channel for honey pot deployment",
     allow_owner="Allow the server owner to send messages in this channel (default: not allowed)",
     mod_channel="Optional: Select a channel to receive honey pot alerts",
+    share_offenders=(
+        "Share caught accounts with other servers that opted in, "
+        "and get warned when they join here"
+    ),
 )
 @app_commands.check(owner_only)
 async def honey_pot(
@@ -1262,6 +1646,7 @@ async def honey_pot(
     channel: discord.TextChannel,
     allow_owner: bool = False,
     mod_channel: discord.TextChannel = None,
+    share_offenders: bool = False,
 ):
     perms = channel.permissions_for(interaction.guild.default_role)
     if not perms.send_messages:
@@ -1270,17 +1655,15 @@ async def honey_pot(
             ephemeral=True,
         )
         return
-    guild_id = str(interaction.guild.id)
-    if guild_id not in guild_config:
-        guild_config[guild_id] = {}
-    if "honey_pot" not in guild_config[str(guild_id)]:
-        guild_config[str(guild_id)]["honey_pot"] = {}
-    guild_config[guild_id]["honey_pot"] = {
-        "channel_id": channel.id,
-        "allow_owner": allow_owner,
-        "honey_pot_mod_channel": mod_channel.id if mod_channel else None,
-    }
-    save_config(guild_config)
+    set_honey_pot(
+        interaction.guild.id,
+        {
+            "channel_id": channel.id,
+            "allow_owner": allow_owner,
+            "honey_pot_mod_channel": mod_channel.id if mod_channel else None,
+            "share_offenders": share_offenders,
+        },
+    )
     try:
         await channel.send(
             "# <a:warn:1355807146851176519>DO NOT POST HERE<a:warn:1355807146851176519>\n\n\n"
@@ -1429,7 +1812,7 @@ class AutobotRoleSummaryView(View):
         if guild_id not in guild_config:
             guild_config[guild_id] = {"auto_roles": {}}
         guild_config[guild_id]["auto_roles"] = self.accum
-        save_config(guild_config)
+        save_config(guild_id)
         await interaction.response.edit_message(
             content="Auto role(s) configured successfully.",
             view=None,
@@ -1443,8 +1826,24 @@ class AutobotRoleSummaryView(View):
         )
 
 
-def run_bot_with_event(ready_event, client):
+def run_bot_with_event(
+    ready_event, client, cluster_id=None, shard_ids=None, shard_count=None, queues=None
+):
+    # The launcher opened the config store before forking this process; SQLite
+    # connections must not be used across fork(), so open our own.
+    config_store.reopen()
+    # Fork the render workers before the bot (or anything else) starts a thread
+    workers.start_cpu()
     log()
     bot = client
     bot.ready_event = ready_event
-    bot.run(TOKEN, log_handler=None)
+    if cluster_id is not None:
+        bot.join_cluster(
+            cluster_id, shard_ids, shard_count, ClusterBus(queues, cluster_id)
+        )
+    try:
+        bot.run(TOKEN, log_handler=None)
+    finally:
+        # This is a child of the launcher and exits through os._exit(), which
+        # skips atexit hooks, so write whatever close() left pending here
+        config_writer.close()
@@ -0,0 +1,200 @@
+import asyncio
+import time
+from collections import deque
+from io import BytesIO
+
+from bot.utils.greet import FONT_SIZE, OUTPUT_FORMATS, banner_assets, create_banner
+
+# What to do with a banner request while the queue is full
+POLICY_WAIT = "wait"  # wait for room in the queue (backpressure on the caller)
+POLICY_TEXT = "text"  # skip the image, the caller sends a text-only greeting
+POLICY_DROP = "drop"  # skip the greeting entirely
+
+
+class BannerDropped(Exception):
+    """Raised by `BannerService.render()` when the greeting should not be sent."""
+
+
+class BannerService:
+    """Queues banner renders and runs them on the worker process pool.
+
+    Requests are kept in one FIFO per guild and served round-robin, so a raid
+    on one server cannot starve greetings everywhere else. At most
+    `concurrency` renders run at once; `max_queue` bounds how many may wait.
+    """
+
+    def __init__(
+        self,
+        pool,
+        concurrency=2,
+        max_queue=100,
+        policy=POLICY_TEXT,
+        cache=None,
+        encode_options=None,
+    ):
+        if policy not in (POLICY_WAIT, POLICY_TEXT, POLICY_DROP):
+            raise ValueError(f"Unknown banner queue policy: {policy!r}")
+        self.encode_options = encode_options or {}
+        output_format = self.encode_options.get("output_format", "png")
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown banner format: {output_format!r}")
+        # File extension for discord.File, e.g. "png" or "webp"
+        self.extension = OUTPUT_FORMATS[output_format][2]
+        self.pool = pool
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.policy = policy
+        self.cache = cache
+        self._queues = {}
+        self._order = deque()
+        self._jobs = asyncio.Semaphore(0)
+        self._space = asyncio.Semaphore(max_queue)
+        self._tasks = []
+        self._pending_writes = set()  # Disk cache writes still running
+        # Metrics
+        self.depth = 0
+        self.max_depth = 0
+        self.rendered = 0
+        self.degraded = 0
+        self.dropped = 0
+        self.failed = 0
+        self.render_time = 0.0
+        self.last_render_time = 0.0
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._worker()) for _ in range(self.concurrency)
+            ]
+
+    def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    async def render(
+        self, guild_id, load_avatar, user_name, leave=False, avatar_key=None
+    ):
+        """Render a banner, returning a BytesIO, or None for a text-only greeting.
+
+        `load_avatar` is an async callable returning the avatar bytes, e.g.
+        `member.display_avatar.read`; it is only awaited once the job runs.
+        With a cache and an `avatar_key` (the avatar hash), identical banners
+        are served from the cache without downloading or rendering anything.
+        The key includes the asset fingerprint, so changed backgrounds or
+        fonts never hit banners rendered from the old files.
+        """
+        key = None
+        if self.cache is not None and avatar_key:
+            banner_assets.ensure_loaded()
+            key = self.cache.make_key(
+                "goodbye" if leave else "welcome",
+                banner_assets.fingerprint,
+                avatar_key,
+                user_name,
+                FONT_SIZE,
+                sorted(self.encode_options.items()),
+            )
+            data = self.cache.get(key)
+            if data is None and self.cache.disk_dir:
+                data = await self.pool.run_io(self.cache.load_from_disk, key)
+                if data is not None:
+                    self.cache.put(key, data)
+            if data is not None:
+                return BytesIO(data)
+            self.cache.record_miss()
+
+        banner = await self._enqueue(guild_id, load_avatar, user_name, leave)
+        if key is not None and banner is not None:
+            data = banner.getvalue()
+            self.cache.put(key, data)
+            if self.cache.disk_dir:
+                self._save_to_disk(key, data)
+        return banner
+
+    def _save_to_disk(self, key, data):
+        # In the background; the banner is already on its way to the caller.
+        # Keep a reference so the task isn't garbage collected mid-write.
+        task = asyncio.create_task(self.pool.run_io(self.cache.save_to_disk, key, data))
+        self._pending_writes.add(task)
+        task.add_done_callback(self._disk_write_done)
+
+    def _disk_write_done(self, task):
+        self._pending_writes.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Could not save banner to the disk cache: {task.exception()}")
+
+    async def _enqueue(self, guild_id, load_avatar, user_name, leave):
+        if self.depth >= self.max_queue:
+            if self.policy == POLICY_TEXT:
+                self.degraded += 1
+                return None
+            if self.policy == POLICY_DROP:
+                self.dropped += 1
+                raise BannerDropped()
+        await self._space.acquire()
+
+        future = asyncio.get_running_loop().create_future()
+        if guild_id not in self._queues:
+            self._queues[guild_id] = deque()
+            self._order.append(guild_id)
+        self._queues[guild_id].append((future, load_avatar, user_name, leave))
+        self.depth += 1
+        self.max_depth = max(self.max_depth, self.depth)
+        self._jobs.release()
+        return await future
+
+    def _next_job(self):
+        guild_id = self._order.popleft()
+        queue = self._queues[guild_id]
+        job = queue.popleft()
+        if queue:
+            self._order.append(guild_id)
+        else:
+            del self._queues[guild_id]
+        self.depth -= 1
+        self._space.release()
+        return job
+
+    async def _worker(self):
+        while True:
+            await self._jobs.acquire()
+            future, load_avatar, user_name, leave = self._next_job()
+            if future.done():
+                continue  # The caller gave up (cancelled or timed out)
+            start = time.perf_counter()
+            try:
+                avatar = await load_avatar()
+                banner = await self.pool.run_cpu(
+                    create_banner,
+                    avatar,
+                    user_name,
+                    leave=leave,
+                    assets_fingerprint=banner_assets.fingerprint,
+                    **self.encode_options,
+                )
+            except Exception as e:
+                self.failed += 1
+                if not future.done():
+                    future.set_exception(e)
+                continue
+            self.last_render_time = time.perf_counter() - start
+            self.render_time += self.last_render_time
+            self.rendered += 1
+            if not future.done():
+                future.set_result(banner)
+
+    def stats(self):
+        stats = self.cache.stats() if self.cache is not None else {}
+        return stats | {
+            "banner_queue_depth": self.depth,
+            "banner_queue_max_depth": self.max_depth,
+            "banners_rendered": self.rendered,
+            "banners_degraded": self.degraded,
+            "banners_dropped": self.dropped,
+            "banners_failed": self.failed,
+            "banner_render_ms": round(self.last_render_time * 1000, 1),
+            "banner_render_avg_ms": round(
+                self.render_time / self.rendered * 1000 if self.rendered else 0.0, 1
+            ),
+        }
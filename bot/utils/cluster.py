@@ -0,0 +1,45 @@
+import threading
+
+
+def split_shards(shard_count, clusters):
+    # Contiguous shard ranges per cluster, e.g. 10 shards / 3 clusters -> 4, 3, 3
+    base, extra = divmod(shard_count, clusters)
+    ranges = []
+    start = 0
+    for cluster_id in range(clusters):
+        size = base + (1 if cluster_id < extra else 0)
+        ranges.append(list(range(start, start + size)))
+        start += size
+    return ranges
+
+
+class ClusterBus:
+    """Broadcasts changes between the bot's cluster processes.
+
+    Every cluster owns one `multiprocessing.Queue`; `publish()` puts a
+    ``(kind, payload)`` message (e.g. the ids of the guilds it just saved) on
+    everyone else's queue, and a listener thread hands the messages it
+    receives to `callback(kind, payload)` on the event loop.
+    """
+
+    def __init__(self, queues, cluster_id):
+        self.queues = queues
+        self.cluster_id = cluster_id
+        self.sent = 0
+        self.received = 0
+
+    def publish(self, kind, payload):
+        for cluster_id, queue in enumerate(self.queues):
+            if cluster_id != self.cluster_id:
+                queue.put((kind, payload))
+        self.sent += 1
+
+    def start(self, loop, callback):
+        def listen():
+            queue = self.queues[self.cluster_id]
+            while True:
+                kind, payload = queue.get()
+                self.received += 1
+                loop.call_soon_threadsafe(callback, kind, payload)
+
+        threading.Thread(target=listen, name="cluster-bus", daemon=True).start()
@@ -0,0 +1,34 @@
+import hashlib
+import json
+import os
+
+
+def command_tree_hash(tree, application_id=None):
+    """Hash of the global commands as they would be sent to Discord.
+
+    Uses each command's ``to_dict()`` payload (names, descriptions, options,
+    localizations and default permissions), so any change that needs a sync
+    changes the hash. The application id is included so a different bot
+    token does not reuse another application's hash.
+    """
+    payload = sorted(
+        (command.to_dict(tree) for command in tree.get_commands()),
+        key=lambda command: (command.get("type", 1), command["name"]),
+    )
+    data = json.dumps([application_id, payload], sort_keys=True, default=str)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def load_synced_hash(path):
+    try:
+        with open(path, "r") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def save_synced_hash(path, digest):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(digest)
+    os.replace(tmp_path, path)
@@ -0,0 +1,293 @@
+import asyncio
+import copy
+import json
+import os
+import sqlite3
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ConfigStore:
+    """Storage backend for the per-guild configuration.
+
+    Backends load the whole configuration once at startup and afterwards
+    persist individual guilds. Passing ``None`` as a guild's config removes it.
+    """
+
+    def load(self):
+        raise NotImplementedError
+
+    def load_guilds(self, guild_ids):
+        config = self.load()
+        return {
+            guild_id: config[guild_id] for guild_id in guild_ids if guild_id in config
+        }
+
+    def reopen(self):
+        pass
+
+    def save_guild(self, guild_id, config):
+        self.save_guilds({guild_id: config})
+
+    def save_guilds(self, changes):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class JSONConfigStore(ConfigStore):
+    """The original single-file backend: ``./config/guild_config.json``."""
+
+    def __init__(self, path):
+        self.path = path
+        self._data = {}
+
+    def load(self):
+        if not os.path.exists(self.path):
+            with open(self.path, "w") as f:
+                json.dump({}, f)
+        with open(self.path, "r") as f:
+            raw = f.read()
+        # Keep a private copy so writes never touch the dict the bot is mutating.
+        self._data = json.loads(raw)
+        return json.loads(raw)
+
+    def save_guilds(self, changes):
+        for guild_id, config in changes.items():
+            if config is None:
+                self._data.pop(str(guild_id), None)
+            else:
+                self._data[str(guild_id)] = config
+        # Write to a temp file next to the config and rename it over the old one,
+        # so a crash mid-write never leaves a truncated guild_config.json behind.
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(self.path)), suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(self._data, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+class SQLiteConfigStore(ConfigStore):
+    """One row per guild in a WAL-mode SQLite database.
+
+    Only the changed guilds are written, each batch in a single transaction.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.connect()
+
+    def connect(self):
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS guild_config ("
+            "guild_id TEXT PRIMARY KEY, data TEXT NOT NULL)"
+        )
+        self.conn.commit()
+
+    def reopen(self):
+        # SQLite connections must not be shared across fork(); each process
+        # (e.g. every cluster) opens its own.
+        self.connect()
+
+    def load(self):
+        rows = self.conn.execute("SELECT guild_id, data FROM guild_config")
+        return {guild_id: json.loads(data) for guild_id, data in rows}
+
+    def load_guilds(self, guild_ids):
+        config = {}
+        for guild_id in guild_ids:
+            row = self.conn.execute(
+                "SELECT data FROM guild_config WHERE guild_id = ?", (str(guild_id),)
+            ).fetchone()
+            if row is not None:
+                config[str(guild_id)] = json.loads(row[0])
+        return config
+
+    def is_empty(self):
+        return (
+            self.conn.execute("SELECT 1 FROM guild_config LIMIT 1").fetchone() is None
+        )
+
+    def save_guilds(self, changes):
+        with self.conn:
+            for guild_id, config in changes.items():
+                if config is None:
+                    self.conn.execute(
+                        "DELETE FROM guild_config WHERE guild_id = ?", (str(guild_id),)
+                    )
+                else:
+                    self.conn.execute(
+                        "INSERT INTO guild_config (guild_id, data) VALUES (?, ?) "
+                        "ON CONFLICT(guild_id) DO UPDATE SET data = excluded.data",
+                        (str(guild_id), json.dumps(config)),
+                    )
+
+    def close(self):
+        self.conn.close()
+
+
+class WriteBehindWriter:
+    """Coalesces config saves and writes them off the event loop.
+
+    ``mark_dirty()`` only records the guild id; the first call schedules a
+    flush ``delay`` seconds later, so every save requested in that window ends
+    up in a single backend write performed on a dedicated writer thread. A
+    failed write puts its guilds back on the loop and retries them with an
+    exponential backoff of up to ``max_retry_delay`` seconds.
+    """
+
+    def __init__(self, store, config, delay=2.0, max_retry_delay=60.0):
+        self.store = store
+        self.config = config
+        self.delay = delay
+        self.max_retry_delay = max_retry_delay
+        self.saves_requested = 0
+        self.writes_performed = 0
+        self.writes_failed = 0
+        self._retry_delay = delay
+        self._dirty = set()
+        self._flush_task = None
+        # Called from the writer thread with the ids of the guilds just written
+        self.on_written = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="config-writer"
+        )
+
+    def mark_dirty(self, guild_id):
+        self.saves_requested += 1
+        self._dirty.add(str(guild_id))
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop (e.g. scripts or shutdown): write immediately.
+            self.flush_sync()
+            return
+        self._schedule_flush(loop)
+
+    def _schedule_flush(self, loop):
+        # One flush at a time; the flush task itself counts as finished once
+        # its write is done, so it can schedule the next one
+        task = self._flush_task
+        if task is None or task.done() or task is asyncio.current_task():
+            self._flush_task = loop.create_task(self._flush_later())
+
+    async def _flush_later(self, delay=None):
+        await asyncio.sleep(self.delay if delay is None else delay)
+        await self.flush()
+
+    def _take_changes(self):
+        dirty, self._dirty = self._dirty, set()
+        # Deep-copy on the loop so the writer thread never sees a dict mid-mutation.
+        return {
+            guild_id: (
+                copy.deepcopy(self.config[guild_id])
+                if guild_id in self.config
+                else None
+            )
+            for guild_id in dirty
+        }
+
+    def _write(self, changes, loop=None):
+        try:
+            self.store.save_guilds(changes)
+            self.writes_performed += 1
+        except Exception as e:
+            print(f"Error saving config for {len(changes)} guild(s): {e}")
+            self.writes_failed += 1
+            if loop is None:
+                self._dirty.update(changes)
+            else:
+                # _dirty is only touched on the loop; hand the guilds back there
+                loop.call_soon_threadsafe(self._retry, changes)
+            return
+        self._retry_delay = self.delay
+        if self.on_written is not None:
+            self.on_written(list(changes))
+
+    def _retry(self, changes):
+        self._dirty.update(changes)
+        delay = self._retry_delay
+        self._retry_delay = min(delay * 2, self.max_retry_delay)
+        self._flush_task = asyncio.get_running_loop().create_task(
+            self._flush_later(delay)
+        )
+
+    def pending(self):
+        return set(self._dirty)
+
+    async def flush(self):
+        if not self._dirty:
+            return
+        changes = self._take_changes()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._write, changes, loop)
+        # Guilds marked dirty during the write found this flush still running
+        # and didn't schedule their own (a failed write has its retry already)
+        if self._dirty:
+            self._schedule_flush(loop)
+
+    def flush_sync(self):
+        if self._dirty:
+            self._write(self._take_changes())
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.flush_sync()
+        self.store.close()
+
+    def stats(self):
+        return {
+            "config_saves_requested": self.saves_requested,
+            "config_writes_performed": self.writes_performed,
+            "config_pending_guilds": len(self._dirty),
+            "config_writes_failed": self.writes_failed,
+        }
+
+
+def migrate_json_to_sqlite(json_path, store):
+    # One-shot import of an existing guild_config.json into an empty database.
+    # The JSON file is kept as "<name>.migrated" so it is not imported twice.
+    if not os.path.exists(json_path) or not store.is_empty():
+        return 0
+    with open(json_path, "r") as f:
+        data = json.load(f)
+    store.save_guilds(data)
+    os.replace(json_path, f"{json_path}.migrated")
+    return len(data)
+
+
+def open_config_store(backend, json_path, db_path):
+    backend = (backend or "json").lower()
+    if backend == "json":
+        return JSONConfigStore(json_path)
+    if backend == "sqlite":
+        store = SQLiteConfigStore(db_path)
+        migrated = migrate_json_to_sqlite(json_path, store)
+        if migrated:
+            print(f"Migrated {migrated} guild config(s) from {json_path} to {db_path}.")
+        return store
+    raise ValueError(
+        f"Unknown CONFIG_BACKEND: {backend!r} (expected 'json' or 'sqlite')."
+    )
+
+
+if __name__ == "__main__":
+    # Usage: python -m bot.utils.config_store [json_path] [db_path]
+    import sys
+
+    json_path = sys.argv[1] if len(sys.argv) > 1 else "./config/guild_config.json"
+    db_path = sys.argv[2] if len(sys.argv) > 2 else "./config/guild_config.db"
+    store = SQLiteConfigStore(db_path)
+    print(f"Migrated {migrate_json_to_sqlite(json_path, store)} guild config(s).")
+    store.close()
@@ -1,34 +1,131 @@
+import os
+from io import BytesIO
+
 from PIL import Image, ImageDraw, ImageFont
 
+WELCOME_BG = "./assets/welcome.png"
+GOODBYE_BG = "./assets/goodbye.png"
+FONT_FILE = "./assets/fonts/SourceHanSansHW-VF.ttf"
+FONT_SIZE = 80
+AVATAR_SIZE = 480
+
+# Output format name -> (PIL format, default save options, file extension)
+OUTPUT_FORMATS = {
+    "png": ("PNG", {"compress_level": 6}, "png"),
+    "webp": ("WEBP", {"quality": 85, "method": 4}, "webp"),
+    "webp-lossless": ("WEBP", {"lossless": True, "quality": 25, "method": 2}, "webp"),
+    "jpeg": ("JPEG", {"quality": 88}, "jpg"),
+}
+
+
+class BannerAssets:
+    """Backgrounds, font and avatar mask, loaded once and shared by every banner.
+
+    Loading is lazy; `reload()` picks up changed files on disk. Backgrounds are
+    handed out as copies so callers can draw on them freely. `fingerprint`
+    identifies the loaded files (name, size, mtime) for render cache keys.
+    """
+
+    def __init__(self):
+        self.loaded = False
+        self.fingerprint = None
+        self.synced = None  # Bot process fingerprint the render worker last loaded for
+
+    def load(self):
+        self.fingerprint = "|".join(
+            f"{path}:{stat.st_size}:{stat.st_mtime_ns}"
+            for path, stat in (
+                (path, os.stat(path)) for path in (WELCOME_BG, GOODBYE_BG, FONT_FILE)
+            )
+        )
+        with Image.open(WELCOME_BG) as img:
+            self.welcome = img.convert("RGBA")
+        with Image.open(GOODBYE_BG) as img:
+            self.goodbye = img.convert("RGBA")
+        self.font = ImageFont.truetype(FONT_FILE, FONT_SIZE)
+
+        # Draw the circle at 4x and downscale it for smooth (anti-aliased) edges
+        big = AVATAR_SIZE * 4
+        mask = Image.new("L", (big, big), 0)
+        ImageDraw.Draw(mask).ellipse((0, 0, big, big), fill=255)
+        self.mask = mask.resize((AVATAR_SIZE, AVATAR_SIZE), Image.LANCZOS)
+        self.loaded = True
+
+    def reload(self):
+        self.loaded = False
+        self.load()
+
+    def ensure_loaded(self):
+        if not self.loaded:
+            self.load()
+
+    def sync(self, fingerprint):
+        # In a render worker: reload once the bot process reloaded its assets
+        if fingerprint != self.synced:
+            self.reload()
+            self.synced = fingerprint
+
+    def background(self, leave=False):
+        self.ensure_loaded()
+        return (self.goodbye if leave else self.welcome).copy()
+
+
+banner_assets = BannerAssets()
+
 
-def create_banner(user_name, leave=False):
+def encode_banner(
+    img, output_format="png", width=None, quality=None, compress_level=None
+):
+    # Encode an RGBA banner into a BytesIO, optionally downscaled to `width`.
+    # `quality` applies to the lossy formats and `compress_level` (0-9) to PNG.
+    pil_format, options, _ = OUTPUT_FORMATS[output_format]
+    options = dict(options)
+    if (
+        quality is not None
+        and pil_format in ("WEBP", "JPEG")
+        and not options.get("lossless")
+    ):
+        options["quality"] = quality
+    if compress_level is not None and pil_format == "PNG":
+        options["compress_level"] = compress_level
 
-    BG_IMG = "./assets/welcome.png"
-    USER_PFP_IMG = "./assets/user_pfp.png"
-    GREET = "./assets/welcome_to_the_sever.png"
+    if width and width < img.width:
+        height = round(img.height * width / img.width)
+        img = img.resize((width, height), Image.LANCZOS)
+    if pil_format == "JPEG":
+        # JPEG has no alpha channel; the bundled backgrounds are opaque anyway
+        img = img.convert("RGB")
 
-    if leave:
-        BG_IMG = "./assets/goodbye.png"
-        GREET = "./assets/a_good_bye.png"
+    banner = BytesIO()
+    img.save(banner, format=pil_format, **options)
+    banner.seek(0)
+    return banner
 
-    with Image.open(BG_IMG).convert("RGBA") as img:
-        pfp = Image.open(USER_PFP_IMG).convert("RGBA")
-        pfp = pfp.resize((480, 480))
 
-        mask = Image.new("L", pfp.size, 0)
-        draw = ImageDraw.Draw(mask)
-        draw.ellipse((0, 0, 480, 480), fill=255)
-        pfp.putalpha(mask)
+def create_banner(
+    avatar, user_name, leave=False, assets_fingerprint=None, **encode_options
+):
+    # Render entirely in memory: `avatar` is the raw image bytes from
+    # `Asset.read()` and the image is returned as a BytesIO for `discord.File`,
+    # so concurrent calls never share files on disk. `encode_options` are
+    # passed on to `encode_banner()` (output_format, width, quality, ...).
+    # Render workers get the bot process's `assets_fingerprint` and reload
+    # the assets when it changes.
+    if assets_fingerprint is not None:
+        banner_assets.sync(assets_fingerprint)
+    img = banner_assets.background(leave)
 
-        img.paste(pfp, (272, 252), pfp)
+    pfp = Image.open(BytesIO(avatar)).convert("RGBA")
+    pfp = pfp.resize((AVATAR_SIZE, AVATAR_SIZE))
+    pfp.putalpha(banner_assets.mask)
 
-        draw = ImageDraw.Draw(img)
+    img.paste(pfp, (272, 252), pfp)
 
-        font = ImageFont.truetype("./assets/fonts/SourceHanSansHW-VF.ttf", 80)
-        text_width = draw.textlength(user_name, font=font)
-        x = (img.width - text_width) / 2
+    draw = ImageDraw.Draw(img)
 
-        draw.text((x, 850), user_name, (219, 82, 117), font=font)
-        img.save(GREET, format="PNG")
+    font = banner_assets.font
+    text_width = draw.textlength(user_name, font=font)
+    x = (img.width - text_width) / 2
 
-    return GREET
+    draw.text((x, 850), user_name, (219, 82, 117), font=font)
+    return encode_banner(img, **encode_options)
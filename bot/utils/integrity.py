@@ -0,0 +1,193 @@
+import asyncio
+import json
+import os
+import time
+
+import discord
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, bursting up to `capacity`."""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class IntegritySweeper:
+    """Removes reaction-role messages (and channels) that no longer exist.
+
+    Instead of fetching every message back to back once a day, a sweep spreads
+    its fetches over `period` seconds with a token bucket, runs at most
+    `concurrency` fetches at once and one per channel (Discord rate-limits
+    message fetches per channel). Messages found in the client's message cache
+    or seen alive recently (e.g. someone reacted to them) are not fetched at
+    all. Progress is saved to `state_path` so a restart resumes the sweep.
+    """
+
+    def __init__(
+        self,
+        client,
+        index,
+        pool,
+        state_path,
+        on_missing_channel,
+        on_missing_message,
+        period=86400,
+        concurrency=4,
+    ):
+        self.client = client
+        self.index = index
+        self.pool = pool
+        self.state_path = state_path
+        self.on_missing_channel = on_missing_channel
+        self.on_missing_message = on_missing_message
+        self.period = period
+        self.concurrency = concurrency
+        self._seen_alive = {}  # message id -> monotonic time it was last seen
+        self._channel_locks = {}
+        self.state = {}
+        # Stats of the current / last sweep
+        self.api_calls = 0
+        self.skipped = 0
+        self.removed = 0
+        self.last_duration = None
+
+    def mark_alive(self, message_id):
+        self._seen_alive[message_id] = time.monotonic()
+
+    def _load_state(self):
+        if not os.path.exists(self.state_path):
+            return {}
+        try:
+            with open(self.state_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_state(self, state):
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+
+    async def _save_state(self):
+        await self.pool.run_io(self._write_state, json.loads(json.dumps(self.state)))
+
+    async def run(self):
+        await self.client.wait_until_ready()
+        self.state = await self.pool.run_io(self._load_state)
+        while True:
+            # Wait for the next sweep, unless one was interrupted by a restart
+            if "started" not in self.state:
+                next_sweep = self.state.get("finished", 0) + self.period
+                await asyncio.sleep(max(0, next_sweep - time.time()))
+            await self.sweep()
+
+    async def sweep(self):
+        if "started" not in self.state:
+            self.state = {"started": time.time(), "checked": [], "api_calls": 0}
+        started = self.state["started"]
+        checked = set(self.state["checked"])
+        self.api_calls = self.state.get("api_calls", 0)
+        self.skipped = 0
+        self.removed = 0
+
+        targets = [
+            (message_id, guild_id, channel_id)
+            for message_id, (guild_id, channel_id) in list(self.index.locations.items())
+            if message_id not in checked
+        ]
+        if targets:
+            # Spread the remaining fetches over the rest of the period
+            remaining = max(self.period - (time.time() - started), 60)
+            bucket = TokenBucket(
+                rate=max(len(targets) / remaining, 1 / 60), capacity=self.concurrency
+            )
+            queue = asyncio.Queue()
+            for target in targets:
+                queue.put_nowait(target)
+            await asyncio.gather(
+                *(self._worker(queue, bucket) for _ in range(self.concurrency))
+            )
+
+        self.last_duration = time.time() - started
+        self.state = {
+            "finished": time.time(),
+            "duration": self.last_duration,
+            "api_calls": self.api_calls,
+        }
+        await self._save_state()
+        print(
+            f"Reaction role sweep finished in {self.last_duration:.0f}s: "
+            f"{self.api_calls} API call(s), {self.skipped} skipped, "
+            f"{self.removed} removed."
+        )
+
+    async def _worker(self, queue, bucket):
+        while not queue.empty():
+            message_id, guild_id, channel_id = queue.get_nowait()
+            await self._check(message_id, guild_id, channel_id, bucket)
+            self.state["checked"].append(message_id)
+            self.state["api_calls"] = self.api_calls
+            if len(self.state["checked"]) % 25 == 0:
+                await self._save_state()
+
+    async def _check(self, message_id, guild_id, channel_id, bucket):
+        if message_id not in self.index:
+            return  # Already removed by an event since the sweep started
+        seen = self._seen_alive.get(message_id)
+        if seen is not None and time.monotonic() - seen < self.period:
+            self.skipped += 1
+            return
+        if discord.utils.get(self.client.cached_messages, id=message_id):
+            self.skipped += 1
+            return
+
+        guild = self.client.get_guild(guild_id)
+        if guild is None or guild.unavailable:
+            return  # Don't remove anything during an outage
+        channel = guild.get_channel(channel_id)
+        if channel is None:
+            # Remove entire channel entry if channel no longer exists
+            self.on_missing_channel(guild_id, channel_id)
+            self.removed += 1
+            return
+
+        lock = self._channel_locks.setdefault(channel_id, asyncio.Lock())
+        async with lock:
+            await bucket.acquire()
+            self.api_calls += 1
+            try:
+                await channel.fetch_message(message_id)
+            except (discord.NotFound, discord.Forbidden):
+                # Message no longer exists; remove from config
+                self.on_missing_message(guild_id, channel_id, message_id)
+                self.removed += 1
+                return
+            except discord.HTTPException as e:
+                print(f"Could not check reaction role message {message_id}: {e}")
+                return
+        self.mark_alive(message_id)
+
+    def stats(self):
+        return {
+            "rr_sweep_checked": len(self.state.get("checked", ())),
+            "rr_sweep_api_calls": self.api_calls,
+            "rr_sweep_removed": self.removed,
+            "rr_sweep_duration": round(self.last_duration or 0),
+        }
@@ -0,0 +1,85 @@
+import asyncio
+import time
+from collections import deque
+
+import discord
+
+
+class RoleAssignmentQueue:
+    """Applies auto roles to new members, one paced worker per guild.
+
+    Each member gets all of their roles in a single `add_roles()` request.
+    During a join wave the requests for a guild are sent one after another at
+    most every `pace` seconds instead of all at once, and a member submitted
+    again before being processed has the roles merged into one request.
+    A request that takes longer than `timeout` seconds is given up on and
+    counted as failed, so a stalled request doesn't hold up the guild's queue.
+    """
+
+    def __init__(self, pace=0.25, timeout=None):
+        self.pace = pace
+        self.timeout = timeout
+        self._pending = {}  # guild id -> {member id: (member, {role id: role}, reason)}
+        self._workers = {}  # guild id -> drain task
+        self._completed = deque()  # completion times within the last minute
+        self.assigned = 0
+        self.roles_assigned = 0
+        self.failed = 0
+
+    def submit(self, member, roles, reason="Auto roles"):
+        guild_id = member.guild.id
+        pending = self._pending.setdefault(guild_id, {})
+        if member.id in pending:
+            pending[member.id][1].update({role.id: role for role in roles})
+        else:
+            pending[member.id] = (member, {role.id: role for role in roles}, reason)
+        if guild_id not in self._workers:
+            self._workers[guild_id] = asyncio.create_task(self._drain(guild_id))
+
+    async def _drain(self, guild_id):
+        try:
+            while self._pending.get(guild_id):
+                pending = self._pending[guild_id]
+                member, roles, reason = pending.pop(next(iter(pending)))
+                start = time.monotonic()
+                try:
+                    await asyncio.wait_for(
+                        member.add_roles(*roles.values(), reason=reason), self.timeout
+                    )
+                except asyncio.TimeoutError:
+                    self.failed += 1
+                    print(
+                        f"Assigning auto roles to {member} timed out "
+                        f"after {self.timeout}s."
+                    )
+                except discord.HTTPException as e:
+                    self.failed += 1
+                    print(f"Could not assign auto roles to {member}: {e}")
+                except Exception as e:
+                    # E.g. a member of a guild that is gone; the rest of the
+                    # guild's queue must not die with it
+                    self.failed += 1
+                    print(f"Error assigning auto roles to {member}: {e!r}")
+                else:
+                    self.assigned += 1
+                    self.roles_assigned += len(roles)
+                    self._completed.append(time.monotonic())
+                await asyncio.sleep(max(0.0, self.pace - (time.monotonic() - start)))
+        finally:
+            self._pending.pop(guild_id, None)
+            del self._workers[guild_id]
+
+    def depth(self):
+        return sum(len(pending) for pending in self._pending.values())
+
+    def stats(self):
+        cutoff = time.monotonic() - 60
+        while self._completed and self._completed[0] < cutoff:
+            self._completed.popleft()
+        return {
+            "auto_role_queue_depth": self.depth(),
+            "auto_role_members_assigned": self.assigned,
+            "auto_roles_assigned": self.roles_assigned,
+            "auto_role_failures": self.failed,
+            "auto_role_members_per_minute": len(self._completed),
+        }
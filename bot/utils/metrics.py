@@ -0,0 +1,87 @@
+import asyncio
+import time
+
+from config.metrics_history import (
+    DAY,
+    DAYS_KEPT,
+    HOUR,
+    HOURS_KEPT,
+    combine,
+    load_history,
+    save_history,
+    top_event_types,
+)
+from config.stats_block import MAX_METRICS, METRIC_FIELDS
+
+
+class MetricsRecorder:
+    """Per-minute metrics with hourly and daily rollups.
+
+    `totals()` returns cumulative counters for `METRIC_FIELDS` (and the
+    current value of the max-type ones), plus cumulative counts per gateway
+    event type under "event_types". Once a minute, the increase of each
+    counter, and of the most frequent event types, is written to the stats
+    slot's minute ring in shared memory, where the dashboard reads it.
+    Finished hours are rolled up into the hourly series and finished days
+    into the daily series, and both are saved to `path` after every rollup.
+    Minutes of an hour cut short by a restart are not rolled up.
+    """
+
+    def __init__(self, slot, path, pool, totals):
+        self.slot = slot
+        self.path = path
+        self.pool = pool
+        self.totals = totals
+        self.history = {"hourly": [], "daily": []}
+        self._previous = {}
+        self._hour = []  # Minute records of the current hour
+        self._day = []  # Hourly records of the current day
+
+    async def run(self):
+        self.history = await self.pool.run_io(load_history, self.path)
+        # Hours of today that were saved before a restart still count for today
+        today = time.time() // DAY
+        self._day = [h for h in self.history["hourly"] if h["time"] // DAY == today]
+        self._previous = self.totals()
+        while True:
+            await asyncio.sleep(60 - time.time() % 60)
+            if self.record_minute(time.time()):
+                history = {key: list(records) for key, records in self.history.items()}
+                await self.pool.run_io(save_history, self.path, history)
+
+    def record_minute(self, now):
+        # Returns True when an hour was rolled up (and the history should be saved)
+        minute = int(now // 60 * 60) - 60  # Start of the minute that just ended
+        totals = self.totals()
+        record = {"time": minute}
+        for name in METRIC_FIELDS:
+            value = totals.get(name, 0)
+            record[name] = (
+                value if name in MAX_METRICS else value - self._previous.get(name, 0)
+            )
+        previous = self._previous.get("event_types", {})
+        record["event_types"] = top_event_types(
+            {
+                name: count - previous.get(name, 0)
+                for name, count in totals.get("event_types", {}).items()
+            }
+        )
+        self._previous = totals
+        self.slot.append_minute(record)
+
+        rolled = bool(self._hour) and self._hour[0]["time"] // HOUR != minute // HOUR
+        if rolled:
+            self._finish_hour()
+        self._hour.append(record)
+        return rolled
+
+    def _finish_hour(self):
+        start = self._hour[0]["time"] // HOUR * HOUR
+        hourly = combine(self._hour, start)
+        self._hour = []
+        self.history["hourly"] = self.history["hourly"][-(HOURS_KEPT - 1) :] + [hourly]
+        if self._day and self._day[0]["time"] // DAY != start // DAY:
+            daily = combine(self._day, self._day[0]["time"] // DAY * DAY)
+            self.history["daily"] = self.history["daily"][-(DAYS_KEPT - 1) :] + [daily]
+            self._day = []
+        self._day.append(hourly)
@@ -0,0 +1,75 @@
+import json
+import os
+import tempfile
+import threading
+import time
+
+
+class OffenderList:
+    """Accounts caught by a honey pot, shared between guilds that opt in.
+
+    Stored as ``{user_id: {"guild_id": ..., "time": ...}}`` in a JSON file;
+    entries older than `ttl` seconds are ignored and dropped on the next save.
+    `save()` may be called from several I/O threads at once; writes are
+    serialized and a snapshot older than the last one written is skipped.
+    """
+
+    def __init__(self, path, ttl=30 * 86400):
+        self.path = path
+        self.ttl = ttl
+        self.offenders = {}
+        self.version = 0
+        self._saved_version = 0
+        self._save_lock = threading.Lock()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                self.offenders = {int(k): v for k, v in json.load(f).items()}
+        except (OSError, ValueError) as e:
+            print(f"Could not load honey pot offenders: {e}")
+
+    def add(self, user_id, guild_id):
+        entry = {"guild_id": guild_id, "time": time.time()}
+        self.offenders[user_id] = entry
+        return entry
+
+    def merge(self, user_id, entry):
+        # Add an entry recorded elsewhere (another cluster), keeping the newest
+        current = self.offenders.get(user_id)
+        if current is None or current["time"] < entry["time"]:
+            self.offenders[user_id] = entry
+
+    def get(self, user_id):
+        entry = self.offenders.get(user_id)
+        if entry is None or time.time() - entry["time"] > self.ttl:
+            return None
+        return entry
+
+    def snapshot(self):
+        # (version, offenders) to pass to save() from another thread
+        cutoff = time.time() - self.ttl
+        self.offenders = {
+            k: v for k, v in self.offenders.items() if v["time"] >= cutoff
+        }
+        self.version += 1
+        return self.version, dict(self.offenders)
+
+    def save(self, snapshot):
+        version, offenders = snapshot
+        with self._save_lock:
+            if version <= self._saved_version:
+                return  # A newer snapshot was already written
+            fd, tmp_path = tempfile.mkstemp(
+                dir=os.path.dirname(self.path) or ".", suffix=".tmp"
+            )
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(offenders, f)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            self._saved_version = version
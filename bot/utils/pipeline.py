@@ -0,0 +1,15 @@
+import asyncio
+
+
+async def run_stages(event, stages):
+    # Run independent (name, coroutine, timeout) stages concurrently. A stage
+    # that fails or times out is logged and does not affect the others.
+    async def run(name, coro, timeout):
+        try:
+            await asyncio.wait_for(coro, timeout)
+        except asyncio.TimeoutError:
+            print(f"{event}: {name} timed out after {timeout}s.")
+        except Exception as e:
+            print(f"{event}: {name} failed: {e}")
+
+    await asyncio.gather(*(run(*stage) for stage in stages))
@@ -0,0 +1,106 @@
+import os
+
+import discord
+
+try:
+    import resource
+except ImportError:  # Unix only
+    resource = None
+
+ALL_FEATURES = ("greetings", "auto_roles", "reaction_roles", "honey_pot")
+
+
+def build_client_options(features, profile="full"):
+    """Intents and cache settings for the enabled features.
+
+    ``full`` keeps the original behaviour: default intents plus members and
+    message content, every member cached and chunked at startup. ``lean``
+    only enables the intents the selected features need, caches no other
+    members (handlers fall back to the REST API) and keeps a small message
+    cache, so large installations don't pay for caching everything.
+    """
+    features = set(features)
+    unknown = features - set(ALL_FEATURES)
+    if unknown:
+        raise ValueError(
+            f"Unknown feature(s) in FEATURES: {', '.join(sorted(unknown))}"
+        )
+
+    if profile == "full":
+        intents = discord.Intents.default()
+        intents.message_content = True
+        intents.members = True
+        return {
+            "intents": intents,
+            "member_cache_flags": discord.MemberCacheFlags.all(),
+            "max_messages": 1000,
+            "chunk_guilds_at_startup": True,
+        }
+    if profile != "lean":
+        raise ValueError(
+            f"Unknown PERF_PROFILE: {profile!r} (expected 'full' or 'lean')."
+        )
+
+    intents = discord.Intents.none()
+    intents.guilds = True
+    # Message events: honey pot triggers and reaction role cleanup on delete
+    intents.guild_messages = True
+    # Reaction events: reaction roles and the emoji picker when creating them
+    intents.guild_reactions = "reaction_roles" in features
+    # Member join/leave events: greetings, auto roles and offender warnings
+    intents.members = bool(features & {"greetings", "auto_roles", "honey_pot"})
+    # Only used to show the offending message in honey pot alerts
+    intents.message_content = "honey_pot" in features
+    return {
+        "intents": intents,
+        "member_cache_flags": discord.MemberCacheFlags.none(),
+        # The honey pot purges the offender's recent messages from this cache
+        "max_messages": 1000 if "honey_pot" in features else 100,
+        "chunk_guilds_at_startup": False,
+    }
+
+
+def parse_features(value):
+    if not value:
+        return ALL_FEATURES
+    return tuple(f.strip() for f in value.split(",") if f.strip())
+
+
+def current_rss():
+    # Resident set size in bytes (peak RSS where /proc is not available),
+    # or None where neither is (Windows)
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        if resource is None:
+            return None
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def parse_shard_ids(value):
+    # "0,1,2" or ranges like "0-3,8" -> [0, 1, 2, 3, 8]; empty -> None (all shards)
+    if not value:
+        return None
+    shard_ids = []
+    for part in value.split(","):
+        part = part.strip()
+        if "-" in part:
+            start, end = part.split("-", 1)
+            shard_ids.extend(range(int(start), int(end) + 1))
+        elif part:
+            shard_ids.append(int(part))
+    return shard_ids
+
+
+def build_shard_options(shard_count=None, shard_ids=None):
+    # Options for AutoShardedClient; without a count Discord's recommendation is used
+    options = {}
+    if shard_count:
+        options["shard_count"] = int(shard_count)
+    shard_ids = parse_shard_ids(shard_ids)
+    if shard_ids is not None:
+        if "shard_count" not in options:
+            raise ValueError("SHARD_IDS requires SHARD_COUNT to be set.")
+        options["shard_ids"] = shard_ids
+    return options
@@ -0,0 +1,139 @@
+class ReactionRoleIndex:
+    """Lookup tables for reaction-role messages, keyed by integer ids.
+
+    `guild_config` stores reaction roles as
+    ``guild -> "reaction_roles" -> channel -> message -> {emoji: role_id}``
+    with string keys. The index mirrors that as ``message_id -> {emoji: role_id}``
+    with int ids, so raw reaction events for unrelated messages are rejected
+    with a single dict lookup, plus per-guild and per-channel tables so the
+    management UI never has to scan other guilds. Every code path that changes
+    reaction roles in the config must update the index as well; `ReactionRoles`
+    does both.
+    """
+
+    def __init__(self):
+        self.messages = {}  # message id -> {emoji: role id}
+        self.locations = {}  # message id -> (guild id, channel id)
+        self.channels = {}  # channel id -> {message id, ...}
+        self.guilds = {}  # guild id -> {message id: channel id}, in creation order
+
+    def rebuild(self, guild_config):
+        self.messages.clear()
+        self.locations.clear()
+        self.channels.clear()
+        self.guilds.clear()
+        for guild_id, config in guild_config.items():
+            self.add_guild(guild_id, config)
+
+    def add_guild(self, guild_id, config):
+        for channel_id, messages in config.get("reaction_roles", {}).items():
+            for message_id, entry in messages.items():
+                self.set_message(guild_id, channel_id, message_id, entry)
+
+    def set_message(self, guild_id, channel_id, message_id, entry):
+        guild_id, channel_id, message_id = (
+            int(guild_id),
+            int(channel_id),
+            int(message_id),
+        )
+        # Keys starting with "_" (e.g. "_raw_content") are metadata, not emojis.
+        self.messages[message_id] = {
+            emoji: int(role_id)
+            for emoji, role_id in entry.items()
+            if not emoji.startswith("_")
+        }
+        self.locations[message_id] = (guild_id, channel_id)
+        self.channels.setdefault(channel_id, set()).add(message_id)
+        self.guilds.setdefault(guild_id, {})[message_id] = channel_id
+
+    def remove_message(self, message_id):
+        message_id = int(message_id)
+        self.messages.pop(message_id, None)
+        location = self.locations.pop(message_id, None)
+        if location is None:
+            return
+        guild_id, channel_id = location
+        channel_messages = self.channels.get(channel_id)
+        if channel_messages is not None:
+            channel_messages.discard(message_id)
+            if not channel_messages:
+                del self.channels[channel_id]
+        guild_messages = self.guilds.get(guild_id)
+        if guild_messages is not None:
+            guild_messages.pop(message_id, None)
+            if not guild_messages:
+                del self.guilds[guild_id]
+
+    def remove_channel(self, channel_id):
+        for message_id in list(self.channels.get(int(channel_id), ())):
+            self.remove_message(message_id)
+
+    def remove_guild(self, guild_id):
+        for message_id in list(self.guilds.get(int(guild_id), ())):
+            self.remove_message(message_id)
+
+    def location(self, message_id):
+        return self.locations.get(int(message_id))
+
+    def guild_messages(self, guild_id):
+        # [(channel_id, message_id), ...] as the string keys used in guild_config
+        return [
+            (str(channel_id), str(message_id))
+            for message_id, channel_id in self.guilds.get(int(guild_id), {}).items()
+        ]
+
+    def __contains__(self, message_id):
+        return message_id in self.messages
+
+
+class ReactionRoles:
+    """Changes reaction roles in `guild_config` and the index together.
+
+    Every change that touches a guild's config calls `save(guild_id)`
+    afterwards; the bot passes its write-behind `save_config`.
+    """
+
+    def __init__(self, guild_config, index, save):
+        self.guild_config = guild_config
+        self.index = index
+        self.save = save
+
+    def set_message(self, guild_id, channel_id, message_id, entry):
+        # Add or replace a reaction-role message ({emoji: role_id, "_raw_content": ...})
+        guild_id = str(guild_id)
+        self.guild_config.setdefault(guild_id, {}).setdefault(
+            "reaction_roles", {}
+        ).setdefault(str(channel_id), {})[str(message_id)] = entry
+        self.index.set_message(guild_id, channel_id, message_id, entry)
+        self.save(guild_id)
+
+    def remove_message(self, guild_id, channel_id, message_id):
+        # Returns True if the message was a reaction-role message and got removed
+        rr = self.guild_config.get(str(guild_id), {}).get("reaction_roles", {})
+        messages = rr.get(str(channel_id))
+        if not messages or str(message_id) not in messages:
+            return False
+        del messages[str(message_id)]
+        # Remove empty channel entries.
+        if not messages:
+            del rr[str(channel_id)]
+        self.index.remove_message(message_id)
+        self.save(guild_id)
+        return True
+
+    def remove_channel(self, guild_id, channel_id):
+        rr = self.guild_config.get(str(guild_id), {}).get("reaction_roles", {})
+        if str(channel_id) not in rr:
+            return False
+        del rr[str(channel_id)]
+        self.index.remove_channel(channel_id)
+        self.save(guild_id)
+        return True
+
+    def remove_guild(self, guild_id):
+        # Drops the guild's whole config, not only its reaction roles
+        if self.guild_config.pop(str(guild_id), None) is None:
+            return False
+        self.index.remove_guild(guild_id)
+        self.save(guild_id)
+        return True
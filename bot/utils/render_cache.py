@@ -0,0 +1,133 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+
+class RenderCache:
+    """LRU cache of rendered banner bytes with an optional on-disk tier.
+
+    The memory tier is bounded by `max_bytes`. When `disk_dir` is set, every
+    rendered banner is also written there (bounded by `disk_max_bytes`, oldest
+    files evicted first) so it survives restarts. The disk methods block and
+    are meant to be called from the I/O worker pool.
+    """
+
+    def __init__(self, max_bytes, disk_dir=None, disk_max_bytes=0):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._disk_index = None
+        self._disk_lock = threading.Lock()
+        self.disk_size = 0
+
+    @staticmethod
+    def make_key(*parts):
+        return hashlib.sha1("\0".join(str(p) for p in parts).encode()).hexdigest()
+
+    def get(self, key):
+        data = self._entries.get(key)
+        if data is None:
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.size -= len(old)
+        self._entries[key] = data
+        self.size += len(data)
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+            self.evictions += 1
+
+    def clear(self):
+        # Drop the memory tier; disk entries become unreachable once the key changes
+        self._entries.clear()
+        self.size = 0
+
+    def record_miss(self):
+        self.misses += 1
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.bin")
+
+    def _load_disk_index(self):
+        # Oldest first, so eviction can pop from the front
+        os.makedirs(self.disk_dir, exist_ok=True)
+        entries = []
+        for name in os.listdir(self.disk_dir):
+            path = os.path.join(self.disk_dir, name)
+            if name.endswith(".bin") and os.path.isfile(path):
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, name[:-4], stat.st_size))
+        entries.sort()
+        self._disk_index = OrderedDict((key, size) for _, key, size in entries)
+        self.disk_size = sum(self._disk_index.values())
+
+    def load_from_disk(self, key):
+        if not self.disk_dir:
+            return None
+        with self._disk_lock:
+            return self._load_from_disk(key)
+
+    def _load_from_disk(self, key):
+        if self._disk_index is None:
+            self._load_disk_index()
+        if key not in self._disk_index:
+            return None
+        try:
+            with open(self._disk_path(key), "rb") as f:
+                data = f.read()
+        except OSError:
+            self.disk_size -= self._disk_index.pop(key)
+            return None
+        self._disk_index.move_to_end(key)
+        self.disk_hits += 1
+        return data
+
+    def save_to_disk(self, key, data):
+        if not self.disk_dir or len(data) > self.disk_max_bytes:
+            return
+        with self._disk_lock:
+            self._save_to_disk(key, data)
+
+    def _save_to_disk(self, key, data):
+        if self._disk_index is None:
+            self._load_disk_index()
+        if key in self._disk_index:
+            return
+        tmp_path = f"{self._disk_path(key)}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, self._disk_path(key))
+        self._disk_index[key] = len(data)
+        self.disk_size += len(data)
+        while self.disk_size > self.disk_max_bytes:
+            evicted, size = self._disk_index.popitem(last=False)
+            self.disk_size -= size
+            try:
+                os.remove(self._disk_path(evicted))
+            except OSError:
+                pass
+
+    def stats(self):
+        return {
+            "render_cache_hits": self.hits,
+            "render_cache_disk_hits": self.disk_hits,
+            "render_cache_misses": self.misses,
+            "render_cache_evictions": self.evictions,
+            "render_cache_bytes": self.size,
+            "render_cache_disk_bytes": self.disk_size,
+        }
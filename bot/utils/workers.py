@@ -0,0 +1,125 @@
+import asyncio
+import functools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+class WorkerPool:
+    """Bounded executors for work that must not run on the event loop.
+
+    ``run_io()`` uses a thread pool for blocking file/disk calls, ``run_cpu()``
+    a process pool for CPU-bound work such as PIL rendering. Both are created
+    lazily, and at most ``max_pending`` jobs per pool are queued at once so a
+    burst of events waits on the loop instead of piling up in the executor.
+    """
+
+    def __init__(
+        self, io_workers=4, cpu_workers=2, max_pending=64, cpu_initializer=None
+    ):
+        self.io_workers = io_workers
+        self.cpu_workers = cpu_workers
+        self.cpu_initializer = cpu_initializer
+        self._io_executor = None
+        self._cpu_executor = None
+        self._io_slots = asyncio.Semaphore(max_pending)
+        self._cpu_slots = asyncio.Semaphore(max_pending)
+
+    @property
+    def io_executor(self):
+        if self._io_executor is None:
+            self._io_executor = ThreadPoolExecutor(
+                max_workers=self.io_workers, thread_name_prefix="moe-io"
+            )
+        return self._io_executor
+
+    @property
+    def cpu_executor(self):
+        if self._cpu_executor is None:
+            # Fork so workers don't re-import the launcher (and with it the bot and
+            # dashboard) on startup. Forking is only safe before this process runs
+            # any threads, so the bot starts the workers early with start_cpu().
+            context = (
+                multiprocessing.get_context("fork")
+                if "fork" in multiprocessing.get_all_start_methods()
+                else None
+            )
+            self._cpu_executor = ProcessPoolExecutor(
+                max_workers=self.cpu_workers,
+                mp_context=context,
+                initializer=self.cpu_initializer,
+            )
+        return self._cpu_executor
+
+    async def run_io(self, func, *args, **kwargs):
+        async with self._io_slots:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.io_executor, functools.partial(func, *args, **kwargs)
+            )
+
+    async def run_cpu(self, func, *args, **kwargs):
+        async with self._cpu_slots:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.cpu_executor, functools.partial(func, *args, **kwargs)
+            )
+
+    def start_cpu(self):
+        """Start the worker processes now, while this process has a single thread.
+
+        A child forked from a process with running threads (e.g. the I/O pool)
+        can deadlock on a lock one of them held. The fork pool starts all its
+        workers with the first job, so run a no-op one.
+        """
+        self.cpu_executor.submit(int).result()
+
+    def shutdown(self):
+        if self._io_executor is not None:
+            self._io_executor.shutdown(wait=True)
+        if self._cpu_executor is not None:
+            self._cpu_executor.shutdown(wait=True, cancel_futures=True)
+
+
+class LoopLagMonitor:
+    """Reports when something blocks the event loop longer than ``threshold``.
+
+    Sleeps for ``interval`` seconds and measures how late it wakes up; any
+    delay beyond the interval is time the loop spent running other callbacks.
+    """
+
+    def __init__(self, threshold=0.25, interval=0.5):
+        self.threshold = threshold
+        self.interval = interval
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.window_max_lag = 0.0  # Since the last take_window_max()
+        self.blocked_count = 0
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = loop.time() - start - self.interval
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            self.window_max_lag = max(self.window_max_lag, lag)
+            if lag > self.threshold:
+                self.blocked_count += 1
+                print(f"Event loop was blocked for {lag * 1000:.0f}ms.")
+
+    def take_window_max(self):
+        lag, self.window_max_lag = self.window_max_lag, 0.0
+        return lag
+
+    def stats(self):
+        return {
+            "loop_lag_ms": round(self.last_lag * 1000, 1),
+            "loop_lag_max_ms": round(self.max_lag * 1000, 1),
+            "loop_blocked_count": self.blocked_count,
+        }
+
+
+workers = WorkerPool(
+    io_workers=int(os.getenv("IO_WORKERS", "4")),
+    cpu_workers=int(os.getenv("CPU_WORKERS", str(min(4, os.cpu_count() or 1)))),
+)
@@ -0,0 +1,119 @@
+import json
+import math
+import os
+from collections import Counter
+
+from config.stats_block import MAX_METRICS, METRIC_FIELDS, TOP_EVENT_TYPES
+
+# Hourly/daily rollups, one file per bot process (cluster): history-<slot>.json
+METRICS_DIR = "./config/metrics"
+HOUR = 3600
+DAY = 86400
+HOURS_KEPT = 24 * 90
+DAYS_KEPT = 365 * 3
+
+_file_cache = {}  # path -> (mtime, history)
+
+
+def top_event_types(counts):
+    """The TOP_EVENT_TYPES most frequent of {event type: count}."""
+    return {
+        name: count
+        for name, count in Counter(counts).most_common(TOP_EVENT_TYPES)
+        if count > 0
+    }
+
+
+def combine(records, start):
+    """Roll `records` up into one record starting at `start`.
+
+    The top event types are summed and cut to the top ones again; types that
+    didn't make the top of a record are missing from the rollup's counts.
+    """
+    rolled = {"time": start}
+    for name in METRIC_FIELDS:
+        values = [record.get(name, 0) for record in records]
+        rolled[name] = max(values, default=0) if name in MAX_METRICS else sum(values)
+    event_types = Counter()
+    for record in records:
+        event_types.update(record.get("event_types") or {})
+    rolled["event_types"] = top_event_types(event_types)
+    return rolled
+
+
+def merge(series):
+    """Combine several processes' records that share a timestamp, sorted by time."""
+    by_time = {}
+    for records in series:
+        for record in records:
+            by_time.setdefault(record["time"], []).append(record)
+    return [combine(records, start) for start, records in sorted(by_time.items())]
+
+
+def downsample(records, points):
+    # Combine consecutive records so at most `points` are left
+    size = max(1, math.ceil(len(records) / max(points, 1)))
+    if size == 1:
+        return records, size
+    return [
+        combine(records[i : i + size], records[i]["time"])
+        for i in range(0, len(records), size)
+    ], size
+
+
+def history_path(slot):
+    return os.path.join(METRICS_DIR, f"history-{slot}.json")
+
+
+def load_history(path):
+    """{"hourly": [record, ...], "daily": [...]}; empty if the file is missing."""
+    history = {"hourly": [], "daily": []}
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return history
+    # Rows are stored as [time, value, ..., event types] in the order of
+    # data["fields"]; files saved before event types were kept have no column
+    fields = ["time"] + data.get("fields", [])
+    for key in history:
+        history[key] = [dict(zip(fields, row)) for row in data.get(key, [])]
+    return history
+
+
+def save_history(path, history):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = {"fields": list(METRIC_FIELDS) + ["event_types"]}
+    for key in ("hourly", "daily"):
+        data[key] = [
+            [record["time"]]
+            + [record.get(name, 0) for name in METRIC_FIELDS]
+            + [record.get("event_types", {})]
+            for record in history[key]
+        ]
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def read_all_histories():
+    """Every process's saved history, reloading a file only when it changed."""
+    histories = []
+    try:
+        names = os.listdir(METRICS_DIR)
+    except OSError:
+        return histories
+    for name in sorted(names):
+        if not (name.startswith("history-") and name.endswith(".json")):
+            continue
+        path = os.path.join(METRICS_DIR, name)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            continue
+        cached = _file_cache.get(path)
+        if cached is None or cached[0] != mtime:
+            cached = _file_cache[path] = (mtime, load_history(path))
+        histories.append(cached[1])
+    return histories
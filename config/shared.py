@@ -1,7 +1,82 @@
-from multiprocessing import Manager
+import os
 
-# Create a single Manager instance
-manager = Manager()
+from config.stats_block import (
+    MAX_SLOTS,
+    MINUTE_RING_SIZE,
+    RING_SIZE,
+    StatsBlock,
+    StatsSlot,
+)
 
-# Shared dictionary for bot statistics
-bot_stats = manager.dict()
+# The launcher's pid names the segment, so the bot and dashboard processes it
+# starts (which inherit this variable) all open the same one.
+os.environ.setdefault("MOE_STATS_SHM", f"moe_stats_{os.getpid()}")
+
+_stats_block = None
+
+
+def stats_block():
+    """The shared stats block, created (or attached to) on first use."""
+    global _stats_block
+    if _stats_block is None:
+        _stats_block = StatsBlock(os.environ["MOE_STATS_SHM"], MAX_SLOTS)
+    return _stats_block
+
+
+def close_stats_block():
+    global _stats_block
+    if _stats_block is not None:
+        _stats_block.close()
+        _stats_block = None
+
+
+def stats_slot(index):
+    return StatsSlot(stats_block, index)
+
+
+# Stats of the bot process (or of the first cluster)
+bot_stats = stats_slot(0)
+
+
+def aggregate_stats():
+    """Combine the stats of every bot process into one view.
+
+    With a single bot process its stats are returned as they are.
+    """
+    clusters = stats_block().read_all()
+    if len(clusters) <= 1:
+        return next(iter(clusters.values()), {})
+    values = clusters.values()
+    shards = {}
+    for cluster in values:
+        shards.update(cluster.get("shards", {}))
+    summed = (
+        "guild_count",
+        "member_joins",
+        "rss_bytes",
+        "events_per_sec",
+        "messages_per_sec",
+        "shards_connected",
+    )
+    stats = {key: sum(c.get(key, 0) for c in values) for key in summed}
+    started = [c["started_at"] for c in values if c.get("started_at")]
+    stats.update(
+        started_at=min(started, default=0),
+        latency_ms=max(c.get("latency_ms", 0) for c in values),
+        shard_count=max(c.get("shard_count", 0) for c in values),
+        shards=shards,
+        clusters=clusters,
+    )
+    return stats
+
+
+def recent_samples(limit=RING_SIZE):
+    """{slot: [sample, ...]} of the last `limit` samples of every bot process."""
+    block = stats_block()
+    return {index: block.samples(index, limit) for index in block.read_all()}
+
+
+def recent_minutes(limit=MINUTE_RING_SIZE):
+    """{slot: [minute metrics, ...]} of every bot process, oldest first."""
+    block = stats_block()
+    return {index: block.minutes(index, limit) for index in block.read_all()}
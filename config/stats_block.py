@@ -0,0 +1,329 @@
+import json
+import struct
+import time
+from multiprocessing import shared_memory
+
+# Numeric stats with a fixed place in every slot. Other keys (e.g. the nested
+# "shards" dict) are stored as JSON in the slot's extra area.
+FIELDS = (
+    "guild_count",
+    "member_joins",
+    "rss_bytes",
+    "startup_seconds",
+    "shard_count",
+    "config_saves_requested",
+    "config_writes_performed",
+    "config_pending_guilds",
+    "config_writes_failed",
+    "loop_lag_ms",
+    "loop_lag_max_ms",
+    "loop_blocked_count",
+    "render_cache_hits",
+    "render_cache_disk_hits",
+    "render_cache_misses",
+    "render_cache_evictions",
+    "render_cache_bytes",
+    "render_cache_disk_bytes",
+    "banner_queue_depth",
+    "banner_queue_max_depth",
+    "banners_rendered",
+    "banners_degraded",
+    "banners_dropped",
+    "banners_failed",
+    "banner_render_ms",
+    "banner_render_avg_ms",
+    "rr_sweep_checked",
+    "rr_sweep_api_calls",
+    "rr_sweep_removed",
+    "rr_sweep_duration",
+    "auto_role_queue_depth",
+    "auto_role_members_assigned",
+    "auto_roles_assigned",
+    "auto_role_failures",
+    "auto_role_members_per_minute",
+    "cluster_messages_sent",
+    "cluster_messages_received",
+    "started_at",
+    "latency_ms",
+    "events_per_sec",
+    "messages_per_sec",
+    "shards_connected",
+)
+FIELD_INDEX = {name: i for i, name in enumerate(FIELDS)}
+
+# Timestamped samples kept in each slot's ring, newest overwriting the oldest
+SAMPLE_FIELDS = (
+    "time",
+    "started_at",
+    "guild_count",
+    "latency_ms",
+    "events_per_sec",
+    "messages_per_sec",
+    "shards_total",
+    "shards_connected",
+    "loop_lag_ms",
+)
+RING_SIZE = 360  # One hour of samples at the bot's 10 second stats interval
+
+# Per-minute metrics (see bot/utils/metrics.py), one record per minute
+METRIC_FIELDS = (
+    "events",
+    "member_joins",
+    "member_removes",
+    "reactions",
+    "honey_pot_scanned",
+    "honey_pot_triggers",
+    "banners_rendered",
+    "reaction_roles_applied",
+    "rest_calls",
+    "loop_lag_max_ms",
+)
+# Metrics combined by taking the maximum instead of the sum
+MAX_METRICS = frozenset({"loop_lag_max_ms"})
+MINUTE_RING_SIZE = 1440  # One day
+# Every minute record also has the most frequent gateway event types,
+# {"MESSAGE_CREATE": count, ...}, stored as JSON in EVENT_TYPES_SIZE bytes
+TOP_EVENT_TYPES = 8
+EVENT_TYPES_SIZE = 320
+
+MAX_SLOTS = 16  # One per bot process (cluster)
+EXTRA_SIZE = 16384
+
+MAGIC = b"MOE1"
+_HEADER = struct.Struct("<4sI")  # magic, slot count
+_SEQ = struct.Struct("<Q")
+_VALUES = struct.Struct(f"<d{len(FIELDS)}dI")  # updated at, fields, extra length
+_RING_COUNT = struct.Struct("<Q")  # records written so far
+
+
+def _fit_json(counts, size):
+    # {name: count} as JSON of at most `size` bytes, dropping the smallest counts
+    items = sorted(counts.items(), key=lambda item: item[1], reverse=True)
+    while True:
+        blob = json.dumps(dict(items), separators=(",", ":")).encode()
+        if len(blob) <= size:
+            return blob
+        items.pop()
+
+
+class _Ring:
+    # Layout of a ring of fixed-size records inside a slot: float64 fields,
+    # optionally followed by a dict stored as JSON in `blob_size` bytes
+    def __init__(self, offset, fields, size, blob_field=None, blob_size=0):
+        self.offset = offset
+        self.fields = fields
+        self.size = size
+        self.blob_field = blob_field
+        self.blob_size = blob_size
+        self.record = struct.Struct(f"<{len(fields)}d{blob_size}s")
+        self.end = offset + _RING_COUNT.size + size * self.record.size
+
+    def append(self, buf, slot_offset, values):
+        ring = slot_offset + self.offset
+        (count,) = _RING_COUNT.unpack_from(buf, ring)
+        position = ring + _RING_COUNT.size + (count % self.size) * self.record.size
+        blob = b""
+        if self.blob_field is not None:
+            blob = _fit_json(values.get(self.blob_field) or {}, self.blob_size)
+        self.record.pack_into(
+            buf,
+            position,
+            *(float(values.get(name) or 0) for name in self.fields),
+            blob,
+        )
+        _RING_COUNT.pack_into(buf, ring, count + 1)
+
+    def unpack(self, raw, limit):
+        # `raw` is a copy of this ring; returns the last `limit` records, oldest first
+        (count,) = _RING_COUNT.unpack_from(raw)
+        records = []
+        for n in range(max(0, count - min(limit, self.size)), count):
+            position = _RING_COUNT.size + (n % self.size) * self.record.size
+            *numbers, blob = self.record.unpack_from(raw, position)
+            record = dict(zip(self.fields, numbers))
+            if self.blob_field is not None:
+                record[self.blob_field] = json.loads(blob.rstrip(b"\0") or b"{}")
+            records.append(record)
+        return records
+
+
+_SAMPLES = _Ring(_SEQ.size + _VALUES.size + EXTRA_SIZE, SAMPLE_FIELDS, RING_SIZE)
+_MINUTES = _Ring(
+    _SAMPLES.end,
+    ("time",) + METRIC_FIELDS,
+    MINUTE_RING_SIZE,
+    blob_field="event_types",
+    blob_size=EVENT_TYPES_SIZE,
+)
+_SLOT_SIZE = _MINUTES.end
+
+
+class StatsBlock:
+    """Bot statistics in a shared memory segment, one slot per bot process.
+
+    Every slot has a single writer (the bot process or cluster that owns it)
+    and any number of readers, e.g. the dashboard. Writes are guarded by a
+    sequence counter (a seqlock): the writer makes it odd, writes the slot and
+    makes it even again, and readers retry until they see the same even value
+    before and after copying the slot. No locks and no server process.
+
+    Besides the latest values, every slot keeps a ring of the last
+    `RING_SIZE` samples (`SAMPLE_FIELDS`) and one of the last
+    `MINUTE_RING_SIZE` per-minute metrics (with their top event types) for
+    the dashboard's history.
+    """
+
+    def __init__(self, name, slots=MAX_SLOTS):
+        self.name = name
+        self.slots = slots
+        try:
+            self.shm = shared_memory.SharedMemory(
+                name, create=True, size=_HEADER.size + slots * _SLOT_SIZE
+            )
+            _HEADER.pack_into(self.shm.buf, 0, MAGIC, slots)
+            self.owner = True
+        except FileExistsError:
+            self.shm = shared_memory.SharedMemory(name)
+            self.owner = False  # Only the creator unlinks the segment
+
+    def _offset(self, index):
+        if not 0 <= index < self.slots:
+            raise IndexError(f"Stats slot {index} out of range (0-{self.slots - 1})")
+        return _HEADER.size + index * _SLOT_SIZE
+
+    def write(self, index, values):
+        numbers = [0.0] * len(FIELDS)
+        extra = {}
+        for key, value in values.items():
+            if key in FIELD_INDEX:
+                numbers[FIELD_INDEX[key]] = float(value or 0)
+            else:
+                extra[key] = value
+        blob = json.dumps(extra).encode() if extra else b""
+        if len(blob) > EXTRA_SIZE:
+            print(
+                f"Stats for slot {index} don't fit ({len(blob)} bytes); "
+                "dropping extras."
+            )
+            blob = b""
+
+        buf = self.shm.buf
+        offset = self._offset(index)
+        (seq,) = _SEQ.unpack_from(buf, offset)
+        _SEQ.pack_into(buf, offset, seq + 1)  # Odd: write in progress
+        _VALUES.pack_into(buf, offset + _SEQ.size, time.time(), *numbers, len(blob))
+        start = offset + _SEQ.size + _VALUES.size
+        buf[start : start + len(blob)] = blob
+        _SEQ.pack_into(buf, offset, seq + 2)
+
+    def _append(self, index, ring, values):
+        buf = self.shm.buf
+        offset = self._offset(index)
+        (seq,) = _SEQ.unpack_from(buf, offset)
+        _SEQ.pack_into(buf, offset, seq + 1)
+        ring.append(buf, offset, values)
+        _SEQ.pack_into(buf, offset, seq + 2)
+
+    def append_sample(self, index, sample):
+        self._append(index, _SAMPLES, sample)
+
+    def append_minute(self, index, metrics):
+        self._append(index, _MINUTES, metrics)
+
+    def _read_consistent(self, index, start, end):
+        # Copy buf[start:end] of a slot (relative offsets) without a torn write
+        buf = self.shm.buf
+        offset = self._offset(index)
+        while True:
+            (seq,) = _SEQ.unpack_from(buf, offset)
+            if seq & 1:
+                time.sleep(0)
+                continue
+            raw = bytes(buf[offset + start : offset + end])
+            if _SEQ.unpack_from(buf, offset)[0] == seq:
+                return raw
+
+    def read(self, index):
+        """The slot's stats as a dict, or {} if nothing was written to it yet."""
+        raw = self._read_consistent(index, _SEQ.size, _SAMPLES.offset)
+        updated_at, *numbers, blob_len = _VALUES.unpack_from(raw)
+        if not updated_at:
+            return {}
+        values = {
+            name: int(number) if number.is_integer() else number
+            for name, number in zip(FIELDS, numbers)
+        }
+        if blob_len:
+            values.update(json.loads(raw[_VALUES.size : _VALUES.size + blob_len]))
+        values["updated_at"] = updated_at
+        return values
+
+    def samples(self, index, limit=RING_SIZE):
+        """The slot's last `limit` samples as dicts, oldest first."""
+        raw = self._read_consistent(index, _SAMPLES.offset, _SAMPLES.end)
+        return _SAMPLES.unpack(raw, limit)
+
+    def minutes(self, index, limit=MINUTE_RING_SIZE):
+        """The slot's last `limit` per-minute metrics as dicts, oldest first."""
+        raw = self._read_consistent(index, _MINUTES.offset, _MINUTES.end)
+        return _MINUTES.unpack(raw, limit)
+
+    def version(self):
+        # Changes whenever any slot is written; cheap enough to poll
+        buf = self.shm.buf
+        return tuple(
+            _SEQ.unpack_from(buf, self._offset(index))[0] for index in range(self.slots)
+        )
+
+    def read_all(self):
+        # {slot: stats} for every slot that has been written to
+        slots = {}
+        for index in range(self.slots):
+            values = self.read(index)
+            if values:
+                slots[index] = values
+        return slots
+
+    def close(self):
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class StatsSlot:
+    """Dict-like view of one slot; writes replace the whole slot at once.
+
+    Only the owning process should write. Each write publishes every value
+    set through this object so far, so batch them with `update()`.
+    """
+
+    def __init__(self, get_block, index):
+        self._get_block = get_block  # Creates/attaches the block on first use
+        self.index = index
+        self._values = {}
+
+    def __setitem__(self, key, value):
+        self._values[key] = value
+        self._get_block().write(self.index, self._values)
+
+    def update(self, *args, **kwargs):
+        self._values.update(*args, **kwargs)
+        self._get_block().write(self.index, self._values)
+
+    def append_sample(self, sample):
+        self._get_block().append_sample(self.index, sample)
+
+    def append_minute(self, metrics):
+        self._get_block().append_minute(self.index, metrics)
+
+    def read(self):
+        return self._get_block().read(self.index)
+
+    def samples(self, limit=RING_SIZE):
+        return self._get_block().samples(self.index, limit)
+
+    def get(self, key, default=None):
+        return self.read().get(key, default)
+
+    def __getitem__(self, key):
+        return self.read()[key]
@@ -11,6 +11,13 @@ def create_app():
         # python -c "import secrets; print(secrets.token_hex(32))"
         raise RuntimeError("SECRET_KEY environment variable is not set!")
     app.config["SECRET_KEY"] = secret_key
+    # Seconds to reuse the rendered index page and /api/stats (0 disables)
+    app.config["RESPONSE_CACHE_TTL"] = float(os.environ.get("DASHBOARD_CACHE_TTL", "5"))
+
+    # Precompressed static files with long-lived cache headers
+    from .caching import setup_static
+
+    setup_static(app)
 
     # Register blueprints
     from .routes.main import main_bp
@@ -1,3 +1,5 @@
+import os
+
 from flask_socketio import SocketIO
 from . import create_app
 
@@ -6,5 +8,5 @@ socketio = SocketIO()
 
 app = create_app()
 
-# Link SocketIO to the Flask app
-socketio.init_app(app)
+# Link SocketIO to the Flask app. Websockets need an async server (gevent).
+socketio.init_app(app, async_mode=os.getenv("DASHBOARD_ASYNC_MODE", "gevent"))
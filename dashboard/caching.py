@@ -0,0 +1,135 @@
+import functools
+import gzip
+import hashlib
+import mimetypes
+import os
+import time
+from datetime import datetime, timezone
+
+from flask import current_app, make_response, request, send_from_directory
+
+try:
+    import brotli
+except ImportError:  # Optional; gzip is always available
+    brotli = None
+
+# Static files are requested with ?v=<content hash>, so they can be cached "forever"
+STATIC_MAX_AGE = 365 * 86400
+
+
+class CachedPage:
+    __slots__ = ("body", "mimetype", "etag", "last_modified", "created")
+
+    def __init__(self, body, mimetype, etag, last_modified, created):
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = etag
+        self.last_modified = last_modified
+        self.created = created
+
+
+def cached_view(view):
+    """Cache a GET view's response for RESPONSE_CACHE_TTL seconds.
+
+    Within the TTL the rendered body is reused instead of calling the view.
+    Every response carries an ETag (hash of the body) and Last-Modified (when
+    the body last changed), so repeat visitors get a 304 without a body.
+    A TTL of 0 disables the cache but keeps the conditional responses.
+    """
+    pages = {}
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        ttl = current_app.config.get("RESPONSE_CACHE_TTL", 0)
+        now = time.monotonic()
+        page = pages.get(request.path)
+        if page is None or now - page.created >= ttl:
+            response = make_response(view(*args, **kwargs))
+            body = response.get_data()
+            etag = hashlib.sha1(body).hexdigest()
+            if page is not None and page.etag == etag:
+                last_modified = page.last_modified  # Unchanged, keep the old date
+            else:
+                last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+            page = CachedPage(body, response.mimetype, etag, last_modified, now)
+            if ttl > 0:
+                pages[request.path] = page
+
+        response = current_app.response_class(page.body, mimetype=page.mimetype)
+        response.set_etag(page.etag)
+        response.last_modified = page.last_modified
+        response.cache_control.public = True
+        response.cache_control.max_age = int(ttl)
+        return response.make_conditional(request)
+
+    return wrapper
+
+
+def _compress_file(path, suffix, compress):
+    target = f"{path}.{suffix}"
+    if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+        return
+    with open(path, "rb") as f:
+        data = f.read()
+    compressed = compress(data)
+    # Already-compressed formats (e.g. GIF/PNG) barely shrink; serve them as is
+    if len(compressed) > len(data) * 0.9:
+        if os.path.exists(target):
+            os.remove(target)
+        return
+    tmp_path = f"{target}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(compressed)
+    os.replace(tmp_path, target)
+
+
+def precompress_static(static_folder):
+    """Write .gz (and .br, with brotli installed) copies of the static files."""
+    versions = {}
+    for name in os.listdir(static_folder):
+        path = os.path.join(static_folder, name)
+        if not os.path.isfile(path) or name.endswith((".gz", ".br", ".tmp")):
+            continue
+        _compress_file(path, "gz", lambda data: gzip.compress(data, 9, mtime=0))
+        if brotli is not None:
+            _compress_file(path, "br", lambda data: brotli.compress(data, quality=11))
+        with open(path, "rb") as f:
+            versions[name] = hashlib.sha1(f.read()).hexdigest()[:12]
+    return versions
+
+
+def setup_static(app):
+    """Serve precompressed static files with long-lived cache headers."""
+    versions = precompress_static(app.static_folder)
+
+    @app.url_defaults
+    def static_version(endpoint, values):
+        # url_for("static", filename=...) -> /static/<file>?v=<content hash>
+        if endpoint == "static" and values.get("filename") in versions:
+            values.setdefault("v", versions[values["filename"]])
+
+    def static(filename):
+        accepted = request.accept_encodings
+        # Guessed from the original name so e.g. styles.css.gz is still text/css
+        mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        for suffix, encoding in (("br", "br"), ("gz", "gzip")):
+            if accepted[encoding] and os.path.isfile(
+                os.path.join(app.static_folder, f"{filename}.{suffix}")
+            ):
+                response = send_from_directory(
+                    app.static_folder,
+                    f"{filename}.{suffix}",
+                    mimetype=mimetype,
+                    max_age=STATIC_MAX_AGE,
+                )
+                response.headers["Content-Encoding"] = encoding
+                break
+        else:
+            response = send_from_directory(
+                app.static_folder, filename, max_age=STATIC_MAX_AGE
+            )
+        response.vary.add("Accept-Encoding")
+        response.cache_control.immutable = True
+        return response
+
+    app.view_functions["static"] = static
@@ -1,48 +1,160 @@
-from flask import Blueprint, render_template, jsonify
-from config.shared import bot_stats  # Import shared variables
-from datetime import datetime
+import os
+import time
+from datetime import datetime, timedelta
+
+from flask import Blueprint, jsonify, render_template, request
+from flask_socketio import emit, join_room, leave_room
+
+from config.metrics_history import downsample, merge, read_all_histories
+from config.shared import aggregate_stats, recent_minutes, recent_samples, stats_block
+from config.stats_block import METRIC_FIELDS
 from dashboard.app import socketio  # Use the socketio instance from app.py
+from dashboard.caching import cached_view
 
 main_bp = Blueprint("main", __name__)
 
-bot_start_time = datetime.now()
 bot_invite_link = "https://discord.com/oauth2/authorize?client_id=1326853669089574952"
 
+# Browsers subscribed to live stats over Socket.IO
+STATS_ROOM = "stats"
+# How often the broadcaster checks the shared stats block for changes (seconds)
+PUSH_INTERVAL = float(os.getenv("DASHBOARD_PUSH_INTERVAL", "1"))
+
+
+def bot_uptime(stats):
+    # Measured from the bot's own start time, not the dashboard's
+    started_at = stats.get("started_at")
+    return max(0, int(time.time() - started_at)) if started_at else 0
+
 
 @main_bp.route("/")
+@cached_view
 def index():
-    # Calculate uptime
-    uptime = datetime.now() - bot_start_time
-    uptime_str = str(uptime).split(".")[0]  # Format as HH:MM:SS
-
-    # Fetch the latest guild count from the shared `bot_stats` dictionary
-    guild_count = bot_stats.get("guild_count", 0)
+    # Read the latest stats from the shared stats block
+    stats = aggregate_stats()
+    uptime_str = str(timedelta(seconds=bot_uptime(stats)))  # Format as HH:MM:SS
 
     # Provide bot statistics to the template
     return render_template(
         "index.html",
         title="Moe Bot",
-        guild_count=guild_count,
+        guild_count=stats.get("guild_count", 0),
         uptime=uptime_str,
         bot_invite_link=bot_invite_link,
         year=datetime.now().year,
     )
 
 
+def live_stats(stats):
+    # The stats shown on the dashboard, except uptime (browsers count it up)
+    return {
+        "guild_count": stats.get("guild_count", 0),
+        "started_at": stats.get("started_at"),
+        "latency_ms": stats.get("latency_ms"),
+        "events_per_sec": stats.get("events_per_sec"),
+        "messages_per_sec": stats.get("messages_per_sec"),
+        "shard_count": stats.get("shard_count"),
+        "shards_connected": stats.get("shards_connected"),
+        "shards": stats.get("shards", {}),
+    }
+
+
 @main_bp.route("/api/stats")
+@cached_view
 def api_stats():
-    # Calculate uptime
-    uptime = datetime.now() - bot_start_time
-    uptime_seconds = int(uptime.total_seconds())  # Uptime in seconds
+    stats = aggregate_stats()
 
     # Return bot statistics as JSON
     return jsonify(
-        guild_count=bot_stats.get("guild_count", 0),
-        uptime_seconds=uptime_seconds,  # Include uptime in seconds
+        uptime_seconds=bot_uptime(stats),  # Include uptime in seconds
+        **live_stats(stats),
+    )
+
+
+@main_bp.route("/api/stats/samples")
+def api_stats_samples():
+    # The last ?limit= samples (10s apart) of every bot process
+    limit = request.args.get("limit", default=60, type=int)
+    return jsonify(
+        {str(index): samples for index, samples in recent_samples(limit).items()}
+    )
+
+
+@socketio.on("subscribe")
+def subscribe():
+    # Send the full stats once; changes follow as "update" events
+    join_room(STATS_ROOM)
+    stats = aggregate_stats()
+    emit("stats", {"uptime_seconds": bot_uptime(stats), **live_stats(stats)})
+
+
+@socketio.on("unsubscribe")
+def unsubscribe():
+    leave_room(STATS_ROOM)
+
+
+# Seconds per record of each history resolution
+HISTORY_RESOLUTIONS = {"minute": 60, "hour": 3600, "day": 86400}
+
+
+@main_bp.route("/api/stats/history", defaults={"resolution": "minute"})
+@main_bp.route("/api/stats/history/<resolution>")
+def api_stats_history(resolution):
+    """Metric series for charts, downsampled to at most ?points= points.
+
+    "minute" covers the last day (from shared memory), "hour" and "day" the
+    rollups saved by the bot. ?metrics=a,b limits the series returned.
+    "event_types" has the most frequent gateway event types of every point.
+    """
+    if resolution not in HISTORY_RESOLUTIONS:
+        return jsonify(error=f"Unknown resolution: {resolution}"), 404
+    points = min(max(request.args.get("points", default=120, type=int), 1), 1440)
+    names = [
+        name
+        for name in request.args.get("metrics", ",".join(METRIC_FIELDS)).split(",")
+        if name in METRIC_FIELDS
+    ]
+
+    if resolution == "minute":
+        records = merge(recent_minutes().values())
+    else:
+        key = "hourly" if resolution == "hour" else "daily"
+        records = merge(history[key] for history in read_all_histories())
+    records, size = downsample(records, points)
+
+    return jsonify(
+        resolution=resolution,
+        step=HISTORY_RESOLUTIONS[resolution] * size,  # Seconds per point
+        time=[record["time"] for record in records],
+        series={name: [record[name] for record in records] for name in names},
+        event_types=[record["event_types"] for record in records],
     )
 
 
-def push_guild_count_update():
-    """Push guild count updates to connected clients."""
-    guild_count = bot_stats.get("guild_count", 0)
-    socketio.emit("update", {"guild_count": guild_count})
+def push_stats_updates():
+    """Push changed stats to subscribed clients.
+
+    The bot writes its stats to the shared stats block; this only reads the
+    block when its version changed and only emits the values that differ
+    from the last update, so idle viewers cost nothing.
+    """
+    last_version = None
+    last = {}
+    while True:
+        socketio.sleep(PUSH_INTERVAL)
+        version = stats_block().version()
+        if version == last_version:
+            continue
+        last_version = version
+        current = live_stats(aggregate_stats())
+        delta = {key: value for key, value in current.items() if last.get(key) != value}
+        last = current
+        if "started_at" in delta:
+            # The bot restarted; reset the uptime the page counts up from
+            delta["uptime_seconds"] = bot_uptime(current)
+        if delta:
+            socketio.emit("update", delta, to=STATS_ROOM)
+
+
+def start_stats_push():
+    socketio.start_background_task(push_stats_updates)
@@ -1,12 +1,14 @@
+import atexit
 import multiprocessing
 import os
 
 from dotenv import load_dotenv
-from waitress import serve
 
 from bot.main import client  # Import directly from bot.main
 from bot.main import run_bot_with_event
-from config.shared import bot_stats
+from bot.utils.cluster import split_shards
+from config.shared import close_stats_block, stats_block
+from config.stats_block import MAX_SLOTS
 from dashboard.app import app, socketio  # Import socketio from app.py
 
 load_dotenv()
@@ -16,25 +18,72 @@ bot_ready_event = multiprocessing.Event()
 
 
 def run_dashboard():
-    from dashboard.routes.main import bot_stats as dashboard_stats
-
     # Wait for the bot to signal readiness
     bot_ready_event.wait()
 
-    # Use the shared `bot_stats` dictionary
-    dashboard_stats.clear()
-    dashboard_stats.update(bot_stats)
+    from dashboard.routes.main import start_stats_push
+
+    # Push stats changes to connected browsers instead of having them poll
+    start_stats_push()
 
     print("Dashboard is running: http://127.0.0.1:8000")
-    # Use Waitress to serve the Flask app securely
-    serve(app, host="0.0.0.0", port=8000, threads=4)  # Use 4 threads for concurrency
+    # Served by gevent so Socket.IO can use websockets. The standard library
+    # isn't monkey-patched: by now this process has imported ssl (through
+    # discord/aiohttp), which gevent can't patch safely, and the dashboard
+    # makes no blocking network calls. Its other work doesn't yield either
+    # way: the stats push copies shared memory (under 1 ms per tick with 16
+    # slots) and the history reads small local files, which patching leaves
+    # blocking as well.
+    socketio.run(app, host="0.0.0.0", port=8000)
+
+
+def start_bot_processes():
+    # CLUSTERS > 1 runs one bot process per shard range. They share the SQLite
+    # config store and tell each other which guilds they saved.
+    clusters = int(os.getenv("CLUSTERS", "1"))
+    if clusters <= 1:
+        return [
+            multiprocessing.Process(
+                target=run_bot_with_event, args=(bot_ready_event, client)
+            )
+        ]
+
+    if os.getenv("CONFIG_BACKEND", "json").lower() != "sqlite":
+        raise SystemExit("CLUSTERS > 1 requires CONFIG_BACKEND='sqlite'.")
+    shard_count = int(os.getenv("SHARD_COUNT") or clusters)
+    if shard_count < clusters:
+        raise SystemExit("SHARD_COUNT must be at least CLUSTERS.")
+    if clusters > MAX_SLOTS:
+        raise SystemExit(f"CLUSTERS can be at most {MAX_SLOTS}.")
+
+    queues = [multiprocessing.Queue() for _ in range(clusters)]
+    processes = []
+    for cluster_id, shard_ids in enumerate(split_shards(shard_count, clusters)):
+        print(f"Cluster {cluster_id}: shards {shard_ids[0]}-{shard_ids[-1]}")
+        processes.append(
+            multiprocessing.Process(
+                target=run_bot_with_event,
+                args=(bot_ready_event, client),
+                kwargs=dict(
+                    cluster_id=cluster_id,
+                    shard_ids=shard_ids,
+                    shard_count=shard_count,
+                    queues=queues,
+                ),
+                name=f"moe-cluster-{cluster_id}",
+            )
+        )
+    return processes
 
 
 if __name__ == "__main__":
+    # Create the shared stats block here so every process below inherits it,
+    # and remove it when the launcher exits.
+    stats_block()
+    atexit.register(close_stats_block)
+
     # Run bot and dashboard in parallel
-    bot_process = multiprocessing.Process(
-        target=run_bot_with_event, args=(bot_ready_event, client)
-    )
+    bot_processes = start_bot_processes()
 
     dashboard_process = None
 
@@ -42,12 +91,14 @@ if __name__ == "__main__":
     if os.getenv("DASHBOARD", "False").lower() == "true":
         dashboard_process = multiprocessing.Process(target=run_dashboard)
 
-    bot_process.start()
+    for bot_process in bot_processes:
+        bot_process.start()
 
     if dashboard_process is not None:
         dashboard_process.start()
 
-    bot_process.join()
+    for bot_process in bot_processes:
+        bot_process.join()
 
     if dashboard_process is not None:
         dashboard_process.join()
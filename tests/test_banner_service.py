@@ -0,0 +1,44 @@
+import asyncio
+from io import BytesIO
+
+from bot.utils import banner_service
+from bot.utils.banner_service import BannerService
+from bot.utils.render_cache import RenderCache
+
+
+class FakePool:
+    async def run_io(self, func, *args, **kwargs):
+        await asyncio.sleep(0)
+        return func(*args, **kwargs)
+
+    async def run_cpu(self, func, *args, **kwargs):
+        return BytesIO(b"banner")
+
+
+def test_failed_disk_cache_write_is_reported(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(banner_service.banner_assets, "loaded", True)
+    monkeypatch.setattr(banner_service.banner_assets, "fingerprint", "assets")
+    cache = RenderCache(1024, disk_dir=str(tmp_path), disk_max_bytes=1024)
+
+    def disk_full(key, data):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(cache, "save_to_disk", disk_full)
+
+    async def load_avatar():
+        return b"avatar"
+
+    async def run():
+        service = BannerService(FakePool(), concurrency=1, cache=cache)
+        service.start()
+        banner = await service.render(1, load_avatar, "moe", avatar_key="hash")
+        pending = len(service._pending_writes)
+        await asyncio.sleep(0.05)
+        service.stop()
+        return banner, pending, service
+
+    banner, pending, service = asyncio.run(run())
+    assert banner.getvalue() == b"banner"
+    assert pending == 1
+    assert not service._pending_writes
+    assert "No space left on device" in capsys.readouterr().out
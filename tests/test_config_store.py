@@ -0,0 +1,54 @@
+import asyncio
+import time
+
+from bot.utils.config_store import ConfigStore, WriteBehindWriter
+
+
+class FlakyStore(ConfigStore):
+    def __init__(self, failures):
+        self.failures = failures
+        self.saved = []
+
+    def save_guilds(self, changes):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("disk full")
+        self.saved.append(changes)
+
+
+def test_failed_write_is_retried():
+    async def run():
+        store = FlakyStore(failures=2)
+        writer = WriteBehindWriter(store, {"1": {"greet": True}}, delay=0.01)
+        writer.mark_dirty(1)
+        await asyncio.sleep(0.3)
+        return store, writer
+
+    store, writer = asyncio.run(run())
+    assert store.saved == [{"1": {"greet": True}}]
+    assert writer.writes_failed == 2
+    assert not writer.pending()
+
+
+class SlowStore(ConfigStore):
+    def __init__(self):
+        self.saved = []
+
+    def save_guilds(self, changes):
+        time.sleep(0.1)
+        self.saved.append(sorted(changes))
+
+
+def test_guild_marked_during_a_write_is_scheduled():
+    async def run():
+        store = SlowStore()
+        writer = WriteBehindWriter(store, {"1": {}, "2": {}}, delay=0.01)
+        writer.mark_dirty(1)
+        await asyncio.sleep(0.05)  # The first write is in progress
+        writer.mark_dirty(2)
+        await asyncio.sleep(0.4)
+        return store, writer
+
+    store, writer = asyncio.run(run())
+    assert store.saved == [["1"], ["2"]]
+    assert not writer.pending()
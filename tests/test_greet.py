@@ -0,0 +1,89 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import pytest
+from PIL import Image, ImageFont
+
+from bot.utils import greet
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(autouse=True)
+def assets(monkeypatch):
+    # Asset paths are relative to the repository root
+    monkeypatch.chdir(REPO_ROOT)
+    if not os.path.exists(greet.FONT_FILE):
+        # The font isn't committed; any scalable font will do for these tests
+        font = ImageFont.load_default(greet.FONT_SIZE)
+        monkeypatch.setattr(greet.ImageFont, "truetype", lambda path, size: font)
+        # Only stat()ed for the asset fingerprint
+        monkeypatch.setattr(greet, "FONT_FILE", greet.WELCOME_BG)
+    greet.banner_assets.loaded = False
+    greet.banner_assets.synced = None
+    yield
+    greet.banner_assets.loaded = False
+    greet.banner_assets.synced = None
+
+
+def make_avatar(color):
+    avatar = BytesIO()
+    Image.new("RGBA", (128, 128), color).save(avatar, format="PNG")
+    return avatar.getvalue()
+
+
+def test_create_banner_returns_image_in_memory():
+    banner = greet.create_banner(make_avatar((10, 20, 30, 255)), "moe")
+    with Image.open(banner) as img:
+        assert img.format == "PNG"
+        assert img.size == greet.banner_assets.welcome.size
+
+
+def test_concurrent_banners_match_serial_renders():
+    avatar = make_avatar((120, 180, 240, 255))
+    names = [f"member {i}" for i in range(8)]
+    expected = {
+        (name, leave): greet.create_banner(avatar, name, leave=leave).getvalue()
+        for name in names
+        for leave in (False, True)
+    }
+
+    jobs = [(name, leave) for name in names for leave in (False, True)] * 2
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(
+            pool.map(
+                lambda job: greet.create_banner(
+                    avatar, job[0], leave=job[1]
+                ).getvalue(),
+                jobs,
+            )
+        )
+
+    for job, result in zip(jobs, results):
+        assert (
+            result == expected[job]
+        ), f"banner for {job} differs from the serial render"
+    # Different names must render differently, or the comparison proves nothing
+    assert len(set(expected.values())) == len(expected)
+
+
+def test_fingerprint_changes_with_assets(tmp_path, monkeypatch):
+    background = tmp_path / "welcome.png"
+    background.write_bytes(open(greet.WELCOME_BG, "rb").read())
+    monkeypatch.setattr(greet, "WELCOME_BG", str(background))
+
+    greet.banner_assets.load()
+    before = greet.banner_assets.fingerprint
+    stat = background.stat()
+    os.utime(background, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    greet.banner_assets.reload()
+    assert greet.banner_assets.fingerprint != before
+
+
+def test_sync_reloads_only_when_the_fingerprint_changes(monkeypatch):
+    loads = []
+    monkeypatch.setattr(greet.banner_assets, "load", lambda: loads.append(1))
+    for fingerprint in ("a", "a", "b", "b"):
+        greet.banner_assets.sync(fingerprint)
+    assert len(loads) == 2
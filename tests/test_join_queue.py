@@ -0,0 +1,55 @@
+import asyncio
+from types import SimpleNamespace
+
+from bot.utils.join_queue import RoleAssignmentQueue
+
+
+class FakeMember:
+    def __init__(self, member_id, delay):
+        self.id = member_id
+        self.guild = SimpleNamespace(id=1)
+        self.delay = delay
+        self.roles = []
+
+    async def add_roles(self, *roles, reason=None):
+        await asyncio.sleep(self.delay)
+        self.roles.extend(roles)
+
+
+def test_stalled_request_times_out_without_blocking_the_guild():
+    async def run():
+        queue = RoleAssignmentQueue(pace=0, timeout=0.05)
+        stalled, next_member = FakeMember(1, delay=10), FakeMember(2, delay=0)
+        role = SimpleNamespace(id=5)
+        queue.submit(stalled, [role])
+        queue.submit(next_member, [role])
+        await asyncio.sleep(0.2)
+        return queue, stalled, next_member
+
+    queue, stalled, next_member = asyncio.run(run())
+    assert stalled.roles == []
+    assert len(next_member.roles) == 1
+    assert (queue.failed, queue.assigned) == (1, 1)
+
+
+class BrokenMember(FakeMember):
+    async def add_roles(self, *roles, reason=None):
+        raise AttributeError("'NoneType' object has no attribute 'id'")
+
+
+def test_unexpected_error_does_not_stop_the_guild_queue():
+    async def run():
+        queue = RoleAssignmentQueue(pace=0)
+        broken, next_member = BrokenMember(1, delay=0), FakeMember(2, delay=0)
+        role = SimpleNamespace(id=5)
+        queue.submit(broken, [role])
+        queue.submit(next_member, [role])
+        await asyncio.sleep(0.05)
+        queue.submit(FakeMember(3, delay=0), [role])  # A later join still works
+        await asyncio.sleep(0.05)
+        return queue, next_member
+
+    queue, next_member = asyncio.run(run())
+    assert len(next_member.roles) == 1
+    assert (queue.failed, queue.assigned) == (1, 2)
+    assert not queue._workers
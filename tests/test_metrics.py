@@ -0,0 +1,72 @@
+import json
+import os
+from collections import Counter
+
+from bot.utils.metrics import MetricsRecorder
+from config.metrics_history import load_history, save_history
+from config.stats_block import (
+    EVENT_TYPES_SIZE,
+    TOP_EVENT_TYPES,
+    StatsBlock,
+    StatsSlot,
+)
+
+HOUR = 3600
+
+
+def test_event_types_are_recorded_and_rolled_up(tmp_path):
+    block = StatsBlock(f"moe_test_{os.getpid()}", slots=1)
+    counts = Counter()
+    try:
+        recorder = MetricsRecorder(
+            StatsSlot(lambda: block, 0),
+            None,
+            None,
+            lambda: {"events": sum(counts.values()), "event_types": dict(counts)},
+        )
+        recorder._previous = recorder.totals()
+        # Two minutes of one hour, then the first minute of the next
+        for minute, events in enumerate(
+            (
+                {"MESSAGE_CREATE": 5, "TYPING_START": 2},
+                {"MESSAGE_CREATE": 1, "GUILD_MEMBER_ADD": 3},
+                {"PRESENCE_UPDATE": 1},
+            )
+        ):
+            counts.update(events)
+            recorder.record_minute(HOUR * (minute // 2 + 1) + 60 * (minute % 2 + 1))
+
+        minutes = block.minutes(0)
+        assert [m["event_types"] for m in minutes] == [
+            {"MESSAGE_CREATE": 5, "TYPING_START": 2},
+            {"MESSAGE_CREATE": 1, "GUILD_MEMBER_ADD": 3},
+            {"PRESENCE_UPDATE": 1},
+        ]
+        assert [m["events"] for m in minutes] == [7, 4, 1]
+        (hourly,) = recorder.history["hourly"]
+        assert hourly["event_types"] == {
+            "MESSAGE_CREATE": 6,
+            "GUILD_MEMBER_ADD": 3,
+            "TYPING_START": 2,
+        }
+
+        path = str(tmp_path / "history-0.json")
+        save_history(path, recorder.history)
+        assert load_history(path)["hourly"] == [hourly]
+    finally:
+        block.close()
+
+
+def test_oversized_event_types_keep_the_largest_counts():
+    block = StatsBlock(f"moe_test_{os.getpid()}", slots=1)
+    try:
+        event_types = {f"{'X' * 40}_{n}": n + 1 for n in range(TOP_EVENT_TYPES)}
+        assert len(json.dumps(event_types)) > EVENT_TYPES_SIZE
+        block.append_minute(0, {"time": 60, "event_types": event_types})
+        (minute,) = block.minutes(0)
+        kept = minute["event_types"]
+        assert kept and kept.items() < event_types.items()
+        dropped = [event_types[name] for name in event_types.keys() - kept.keys()]
+        assert min(kept.values()) > max(dropped)
+    finally:
+        block.close()
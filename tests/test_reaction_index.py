@@ -0,0 +1,156 @@
+import asyncio
+from types import SimpleNamespace
+
+import discord
+
+from bot.utils.integrity import IntegritySweeper
+from bot.utils.reaction_index import ReactionRoleIndex, ReactionRoles
+
+
+def make_roles():
+    # The helpers bot/main.py uses, recording saves instead of writing them
+    saved = []
+    roles = ReactionRoles({}, ReactionRoleIndex(), saved.append)
+    roles.saved = saved
+    return roles
+
+
+def assert_consistent(roles):
+    # Every table must equal what a fresh rebuild from guild_config produces
+    expected = ReactionRoleIndex()
+    expected.rebuild(roles.guild_config)
+    assert roles.index.messages == expected.messages
+    assert roles.index.locations == expected.locations
+    assert roles.index.channels == expected.channels
+    assert roles.index.guilds == expected.guilds
+
+
+def populated():
+    roles = make_roles()
+    roles.set_message(1, 10, 100, {"👍": "1000", "_raw_content": "hi"})
+    roles.set_message(1, 10, 101, {"🎉": "1001"})
+    roles.set_message(1, 11, 102, {"✅": "1002"})
+    roles.set_message(1, 11, 103, {"✅": "1003"})
+    roles.set_message(2, 20, 200, {"👍": "2000"})
+    return roles
+
+
+def test_rebuild_uses_int_ids_and_skips_metadata():
+    roles = populated()
+    assert roles.index.messages[100] == {"👍": 1000}
+    assert roles.index.location(100) == (1, 10)
+    assert roles.index.guild_messages(1) == [
+        ("10", "100"),
+        ("10", "101"),
+        ("11", "102"),
+        ("11", "103"),
+    ]
+    assert 200 in roles.index
+    assert_consistent(roles)
+
+
+def test_add_edit_delete():
+    roles = populated()
+    roles.set_message(2, 21, 201, {"⭐": "2001"})
+    assert_consistent(roles)
+
+    # Editing replaces the roles of the message
+    roles.set_message(1, 10, 100, {"❤️": "1003"})
+    assert roles.index.messages[100] == {"❤️": 1003}
+    assert_consistent(roles)
+
+    roles.saved.clear()
+    assert roles.remove_message(1, 11, 102)
+    assert roles.saved == [1]
+    assert 102 not in roles.index
+    assert_consistent(roles)
+
+    roles.remove_message(1, 11, 103)
+    assert 11 not in roles.index.channels
+    assert_consistent(roles)
+
+    roles.remove_message(2, 20, 200)
+    roles.remove_message(2, 21, 201)
+    assert 2 not in roles.index.guilds
+    assert_consistent(roles)
+
+
+def test_remove_missing_message_is_a_no_op():
+    roles = populated()
+    roles.saved.clear()
+    assert not roles.remove_message(1, 10, 999)
+    assert not roles.remove_channel(1, 99)
+    roles.index.remove_message(999)
+    assert roles.saved == []
+    assert_consistent(roles)
+
+
+def test_remove_channel():
+    roles = populated()
+    roles.remove_channel(1, 10)
+    assert 100 not in roles.index and 101 not in roles.index
+    assert 10 not in roles.index.channels
+    assert roles.index.guild_messages(1) == [("11", "102"), ("11", "103")]
+    assert_consistent(roles)
+
+
+def test_remove_guild():
+    roles = populated()
+    roles.saved.clear()
+    assert roles.remove_guild(1)
+    assert roles.saved == [1]
+    assert "1" not in roles.guild_config
+    assert 1 not in roles.index.guilds
+    assert set(roles.index.messages) == {200}
+    assert_consistent(roles)
+
+
+class FakePool:
+    async def run_io(self, func, *args, **kwargs):
+        return func(*args, **kwargs)
+
+
+def not_found():
+    return discord.NotFound(SimpleNamespace(status=404, reason="Not Found"), "gone")
+
+
+def test_integrity_sweep_cleanup_keeps_index_consistent(tmp_path):
+    roles = populated()
+    deleted = {101}  # Deleted while the bot was offline
+
+    async def fetch_message(message_id):
+        if message_id in deleted:
+            raise not_found()
+        return SimpleNamespace(id=message_id)
+
+    channel = SimpleNamespace(fetch_message=fetch_message)
+    # Channel 11 no longer exists; guild 2 is unavailable and must be left alone
+    guild_1 = SimpleNamespace(
+        unavailable=False,
+        get_channel=lambda channel_id: channel if channel_id == 10 else None,
+    )
+    guild_2 = SimpleNamespace(unavailable=True, get_channel=lambda channel_id: None)
+    client = SimpleNamespace(
+        cached_messages=[],
+        get_guild=lambda guild_id: {1: guild_1, 2: guild_2}.get(guild_id),
+    )
+    sweeper = IntegritySweeper(
+        client,
+        roles.index,
+        FakePool(),
+        state_path=str(tmp_path / "integrity_state.json"),
+        on_missing_channel=roles.remove_channel,
+        on_missing_message=roles.remove_message,
+        period=1,
+        concurrency=4,
+    )
+
+    asyncio.run(sweeper.sweep())
+
+    assert set(roles.index.messages) == {100, 200}
+    assert roles.guild_config["1"]["reaction_roles"] == {
+        "10": {"100": {"👍": "1000", "_raw_content": "hi"}}
+    }
+    # Channel 11 is removed once; its second message is already gone by then
+    assert sweeper.removed == 2
+    assert_consistent(roles)